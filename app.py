@@ -1,10 +1,23 @@
-from flask import Flask, request, jsonify, render_template_string, session
+from flask import Flask, Response, g, request, jsonify, render_template_string, session, stream_with_context
 from flask_cors import CORS
 from werkzeug.security import generate_password_hash, check_password_hash
+import atexit
+import functools
+import hmac
 import json
 import os
+import time
+import urllib.error
+import urllib.request
 from datetime import timedelta
 from blockchain import Blockchain, Transaction
+from jobs import MiningJobManager
+from merkle import hash_transaction
+from metrics import REGISTRY, Gauge, Histogram
+from profiler import PROFILER
+from replica import ChainFollower
+from response_cache import ResponseCache
+from storage import AccountStore
 import uuid
 
 app = Flask(__name__)
@@ -12,57 +25,185 @@ app.secret_key = 'tu_clave_secreta_super_segura_aqui'
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)
 CORS(app)
 
-blockchain = Blockchain(difficulty=99)
-
-users_file = 'users.json'
-balances_file = 'balances.json'
-
-def load_users():
-    if os.path.exists(users_file):
-        with open(users_file, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_users(users):
-    with open(users_file, 'w') as f:
-        json.dump(users, f)
-
-def load_balances():
-    if os.path.exists(balances_file):
-        with open(balances_file, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_balances(balances):
-    with open(balances_file, 'w') as f:
-        json.dump(balances, f)
-
-users = load_users()
-balances = load_balances()
+# Papel del proceso (ver serve.py): 'writer' mina, acepta transacciones y
+# escribe la cadena; 'reader' sirve las lecturas desde la cadena en disco que
+# escribe el anterior y le reenvía todo lo que modifica el estado
+ROLE = os.environ.get('BLOCKCHAIN_ROLE', 'writer')
+WRITER_URL = os.environ.get('BLOCKCHAIN_WRITER_URL', 'http://127.0.0.1:5001')
+if ROLE not in ('writer', 'reader'):
+    raise ValueError("BLOCKCHAIN_ROLE debe ser 'writer' o 'reader'")
+READ_ONLY = ROLE == 'reader'
+
+blockchain = Blockchain(difficulty=4, mining_workers=1, block_time=10.0, retarget_interval=10,
+                        data_dir='blockchain_data', read_only=READ_ONLY)
+atexit.register(blockchain.close)
+mining_jobs = MiningJobManager(blockchain)
+if READ_ONLY:
+    follower = ChainFollower(blockchain, WRITER_URL)
+    follower.start()
+
+# Los antiguos users.json / balances.json se importan la primera vez que se crea la base
+accounts = AccountStore('accounts.db', users_file='users.json', balances_file='balances.json',
+                        read_only=READ_ONLY)
+atexit.register(accounts.close)
+
+MAX_BATCH_TRANSFERS = 5000
+
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'Duración de las peticiones por ruta',
+                            ['method', 'route', 'status'])
+Gauge('blockchain_height', 'Altura del último bloque', function=lambda: blockchain.snapshot().height)
+Gauge('blockchain_pending_transactions', 'Transacciones pendientes',
+      function=lambda: len(blockchain.pending_transactions))
+Gauge('blockchain_wallets', 'Direcciones con saldo registrado en la cadena',
+      function=lambda: len(blockchain.balances))
+Gauge('blockchain_miners', 'Mineros registrados', function=lambda: len(blockchain.all_miners))
+Gauge('accounts_users', 'Usuarios registrados', function=lambda: accounts.count_users())
+Gauge('blockchain_difficulty', 'Dificultad actual', function=lambda: blockchain.difficulty)
+Gauge('mining_jobs_active', 'Trabajos de minería en curso',
+      function=lambda: mining_jobs.active_count())
+
+# Token para los endpoints de administración; sin él quedan deshabilitados
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+MAX_PROFILE_SECONDS = 300
+
+def is_admin():
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN)
+
+# Sin perfilar: el propio endpoint de perfilado y los flujos, que mantienen la
+# petición abierta y ocuparían el perfilador durante toda la sesión
+UNPROFILED_ENDPOINTS = frozenset({'profile_node', 'stream_events', 'stream_chain'})
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if request.endpoint not in UNPROFILED_ENDPOINTS:
+        g.profile = PROFILER.begin()
+
+@app.teardown_request
+def finish_request_profile(error):
+    if request.endpoint not in UNPROFILED_ENDPOINTS:
+        PROFILER.end(g.pop('profile', None))
+        PROFILER.request_finished()
+
+@app.after_request
+def record_request_duration(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # Se etiqueta por patrón de ruta, no por URL, para acotar las series
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.labels(request.method, route, str(response.status_code)).observe(
+            time.perf_counter() - started)
+    return response
+
+# Respuestas de lectura ya serializadas, válidas mientras no cambie el estado del que dependen
+response_cache = ResponseCache(max_bytes=32 * 1024 * 1024)
+
+def state_version(depends):
+    """Versión de las partes del estado de las que depende una respuesta"""
+    version = [blockchain.snapshot().length, blockchain.verified_height]
+    if 'mempool' in depends:
+        version.append(blockchain.pending_transactions.version)
+    if 'accounts' in depends:
+        version.append(accounts.count_users())
+    return tuple(version)
+
+def cached_response(*depends):
+    """Sirve la respuesta desde la caché con ETag y 304 mientras no avance la cadena.
+    
+    Toda respuesta depende de la cadena; `depends` añade 'mempool' o
+    'accounts' para las que también cambian con las pendientes o los usuarios.
+    Solo se guardan las respuestas 200.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = (request.full_path, state_version(depends))
+            entry = response_cache.get(key)
+            if entry is None:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                entry = response_cache.put(key, response.get_data(), response.mimetype)
+            
+            use_gzip = entry.gzipped is not None and 'gzip' in request.headers.get('Accept-Encoding', '')
+            etag = entry.etag + '-gz' if use_gzip else entry.etag
+            if etag in request.if_none_match:
+                response = Response(status=304)
+            else:
+                response = Response(entry.gzipped if use_gzip else entry.body, mimetype=entry.mimetype)
+                if use_gzip:
+                    response.headers['Content-Encoding'] = 'gzip'
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'  # Revalidar siempre con If-None-Match
+            if entry.gzipped is not None:
+                response.vary.add('Accept-Encoding')
+            return response
+        return wrapper
+    return decorator
+
+# Cabeceras que se pasan entre un lector y el escritor al reenviar una petición
+FORWARDED_REQUEST_HEADERS = ('Content-Type', 'Cookie', 'Accept', 'User-Agent')
+SKIPPED_RESPONSE_HEADERS = {'connection', 'content-length', 'date', 'keep-alive', 'server',
+                            'transfer-encoding'}
+FORWARD_TIMEOUT = 30
+
+def forward_to_writer():
+    """Reenvía la petición actual al proceso escritor y retorna su respuesta"""
+    url = WRITER_URL.rstrip('/') + request.path
+    if request.query_string:
+        url += '?' + request.query_string.decode()
+    headers = {name: request.headers[name] for name in FORWARDED_REQUEST_HEADERS
+               if name in request.headers}
+    headers['X-Forwarded-For'] = request.remote_addr or ''
+    upstream_request = urllib.request.Request(url, data=request.get_data() or None,
+                                              method=request.method, headers=headers)
+    try:
+        upstream = urllib.request.urlopen(upstream_request, timeout=FORWARD_TIMEOUT)
+    except urllib.error.HTTPError as e:
+        upstream = e  # Las respuestas 4xx/5xx también se pasan al cliente
+    except OSError:
+        return jsonify({'error': 'Nodo escritor no disponible'}), 502
+    
+    with upstream:
+        body = upstream.read()
+    headers = [(name, value) for name, value in upstream.headers.items()
+               if name.lower() not in SKIPPED_RESPONSE_HEADERS]
+    return Response(body, status=upstream.status, headers=headers)
+
+def writer_route(view):
+    """Ruta que modifica el estado o lee el mempool: en un lector se reenvía al escritor"""
+    if not READ_ONLY:
+        return view
+    
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        return forward_to_writer()
+    return wrapper
 
 @app.route('/api/register', methods=['POST'])
+@writer_route
 def register():
     data = request.json
     
     if not data or not data.get('email') or not data.get('password'):
         return jsonify({'error': 'Email y contraseña requeridos'}), 400
     
-    if data['email'] in users:
+    if accounts.has_user(data['email']):
         return jsonify({'error': 'El usuario ya existe'}), 400
     
     wallet_address = str(uuid.uuid4())[:16]
     
-    users[data['email']] = {
-        'password': generate_password_hash(data['password']),
-        'wallet_address': wallet_address,
-        'created_at': str(__import__('datetime').datetime.now())
-    }
-    
-    balances[wallet_address] = 0
-    blockchain.balances[wallet_address] = 0
+    created = accounts.create_user(
+        data['email'],
+        generate_password_hash(data['password']),
+        wallet_address,
+        str(__import__('datetime').datetime.now()),
+        balance=0
+    )
+    if not created:
+        return jsonify({'error': 'El usuario ya existe'}), 400
     
-    save_users(users)
-    save_balances(balances)
+    blockchain.register_wallet(wallet_address)
     
     return jsonify({
         'message': 'Usuario registrado exitosamente',
@@ -76,7 +217,7 @@ def login():
     if not data or not data.get('email') or not data.get('password'):
         return jsonify({'error': 'Email y contraseña requeridos'}), 400
     
-    user = users.get(data['email'])
+    user = accounts.get_user(data['email'])
     
     if not user or not check_password_hash(user['password'], data['password']):
         return jsonify({'error': 'Credenciales inválidas'}), 401
@@ -109,11 +250,17 @@ def get_user():
     }), 200
 
 @app.route('/api/balance/<wallet_address>', methods=['GET'])
+@cached_response('mempool')
 def get_balance(wallet_address):
     balance = blockchain.get_balance(wallet_address)
-    return jsonify({'wallet_address': wallet_address, 'balance': balance}), 200
+    return jsonify({
+        'wallet_address': wallet_address,
+        'balance': balance,
+        'available_balance': blockchain.get_available_balance(wallet_address)
+    }), 200
 
 @app.route('/api/transaction', methods=['POST'])
+@writer_route
 def create_transaction():
     if 'wallet_address' not in session:
         return jsonify({'error': 'No autenticado'}), 401
@@ -130,7 +277,7 @@ def create_transaction():
         return jsonify({'error': 'No puedes enviar a tu propia dirección'}), 400
     
     required = amount + (amount * 0.02)
-    if blockchain.get_balance(sender) < required:
+    if blockchain.get_available_balance(sender) < required:
         return jsonify({'error': 'Saldo insuficiente'}), 400
     
     transaction = Transaction(sender, receiver, amount)
@@ -143,70 +290,306 @@ def create_transaction():
     else:
         return jsonify({'error': 'Transacción inválida'}), 400
 
+@app.route('/api/transactions/batch', methods=['POST'])
+@writer_route
+def create_transactions_batch():
+    if 'wallet_address' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    
+    data = request.json
+    transfers = data.get('transfers') if isinstance(data, dict) else None
+    if not isinstance(transfers, list) or not transfers:
+        return jsonify({'error': 'Se requiere una lista de transferencias'}), 400
+    if len(transfers) > MAX_BATCH_TRANSFERS:
+        return jsonify({'error': f'Máximo {MAX_BATCH_TRANSFERS} transferencias por lote'}), 400
+    
+    sender = session['wallet_address']
+    results = [None] * len(transfers)
+    candidates = []
+    
+    for i, transfer in enumerate(transfers):
+        try:
+            receiver = transfer.get('receiver')
+            amount = float(transfer.get('amount', 0))
+        except (AttributeError, TypeError, ValueError):
+            receiver, amount = None, 0
+        
+        if not receiver or amount <= 0:
+            results[i] = {'index': i, 'accepted': False, 'error': 'Datos de transacción inválidos'}
+        elif sender == receiver:
+            results[i] = {'index': i, 'accepted': False, 'error': 'No puedes enviar a tu propia dirección'}
+        else:
+            candidates.append((i, Transaction(sender, receiver, amount)))
+    
+    accepted = blockchain.add_transactions([tx for _, tx in candidates])
+    for (i, transaction), ok in zip(candidates, accepted):
+        if ok:
+            results[i] = {'index': i, 'accepted': True, 'commission': transaction.commission}
+        else:
+            results[i] = {'index': i, 'accepted': False, 'error': 'Saldo insuficiente o transacción rechazada'}
+    
+    total_accepted = sum(1 for result in results if result['accepted'])
+    return jsonify({
+        'accepted': total_accepted,
+        'rejected': len(results) - total_accepted,
+        'results': results
+    }), 200
+
 @app.route('/api/mine', methods=['POST'])
+@writer_route
 def mine_block():
     if 'wallet_address' not in session:
         return jsonify({'error': 'No autenticado'}), 401
     
     miner_address = session['wallet_address']
-    block = blockchain.mine_pending_transactions(miner_address)
+    try:
+        job = mining_jobs.submit(miner_address)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 503
     
-    if block:
-        mining_tx = next((tx for tx in block.transactions if tx['sender'] == 'SISTEMA'), None)
-        mining_reward = mining_tx['amount'] if mining_tx else 0
-        
-        return jsonify({
-            'message': 'Bloque minado exitosamente',
-            'block': {
-                'index': block.index,
-                'hash': block.hash,
-                'nonce': block.nonce,
-                'transactions': block.transactions
-            },
-            'miner_reward': mining_reward,
-            'new_balance': blockchain.get_balance(miner_address)
-        }), 201
-    else:
-        return jsonify({'error': 'Error al minar'}), 500
+    return jsonify({
+        'message': 'Trabajo de minería iniciado',
+        'job_id': job.id,
+        'status': job.status,
+        'status_url': f'/api/mine/{job.id}'
+    }), 202
+
+def get_own_job(job_id):
+    job = mining_jobs.get(job_id)
+    if job is None or job.miner_address != session.get('wallet_address'):
+        return None
+    return job
+
+@app.route('/api/mine/<job_id>', methods=['GET'])
+@writer_route
+def get_mining_job(job_id):
+    if 'wallet_address' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    
+    job = get_own_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    
+    data = job.to_dict()
+    if job.block is not None:
+        mining_tx = next((tx for tx in job.block.transactions if tx['sender'] == 'SISTEMA'), None)
+        data['miner_reward'] = mining_tx['amount'] if mining_tx else 0
+        data['new_balance'] = blockchain.get_balance(job.miner_address)
+    return jsonify(data), 200
+
+@app.route('/api/mine/<job_id>', methods=['DELETE'])
+@writer_route
+def cancel_mining_job(job_id):
+    if 'wallet_address' not in session:
+        return jsonify({'error': 'No autenticado'}), 401
+    
+    job = get_own_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Trabajo no encontrado'}), 404
+    
+    if not mining_jobs.cancel(job_id):
+        return jsonify({'error': 'El trabajo ya terminó', 'status': job.status}), 409
+    return jsonify({'message': 'Cancelación solicitada', 'job_id': job_id}), 202
 
 @app.route('/api/pending-transactions', methods=['GET'])
+@writer_route
 def get_pending():
+    limit = request.args.get('limit', 100, type=int)
+    if not 1 <= limit <= 1000:
+        return jsonify({'error': 'Límite inválido'}), 400
+    
     return jsonify({
         'count': len(blockchain.pending_transactions),
-        'transactions': [tx.to_dict() for tx in blockchain.pending_transactions]
+        'transactions': [tx.to_dict() for tx in blockchain.pending_transactions.top(limit)]
     }), 200
 
+@app.route('/api/pending-transactions/state', methods=['GET'])
+@writer_route
+def get_mempool_state():
+    # Estado completo de las reservas con el que arranca cada réplica de solo lectura
+    return jsonify(blockchain.get_mempool_state()), 200
+
 @app.route('/api/history/<wallet_address>', methods=['GET'])
+@cached_response()
 def get_history(wallet_address):
-    history = blockchain.get_transaction_history(wallet_address)
-    return jsonify({'history': history}), 200
+    cursor = request.args.get('cursor', 0, type=int)
+    limit = request.args.get('limit', type=int)
+    if cursor < 0 or (limit is not None and not 1 <= limit <= 1000):
+        return jsonify({'error': 'Paginación inválida'}), 400
+    
+    history = blockchain.get_transaction_history(wallet_address, cursor, limit)
+    next_cursor = cursor + len(history)
+    if next_cursor >= blockchain.get_history_length(wallet_address):
+        next_cursor = None
+    return jsonify({'history': history, 'next_cursor': next_cursor}), 200
+
+@app.route('/api/proof/<int:block_index>/<int:tx_index>', methods=['GET'])
+def get_merkle_proof(block_index, tx_index):
+    block = blockchain.get_block(block_index)
+    if block is None:
+        return jsonify({'error': 'Bloque no encontrado'}), 404
+    
+    if tx_index >= len(block.transactions):
+        return jsonify({'error': 'Transacción no encontrada'}), 404
+    
+    transaction = block.transactions[tx_index]
+    return jsonify({
+        'block_index': block.index,
+        'block_hash': block.hash,
+        'merkle_root': block.merkle_root,
+        # Con la cabecera se comprueba que merkle_root pertenece a block_hash
+        'header': dict(block.header_fields(), nonce=block.nonce),
+        'tx_index': tx_index,
+        'tx_hash': hash_transaction(transaction).hex(),
+        'transaction': transaction,
+        'proof': block.get_merkle_proof(tx_index)
+    }), 200
+
+def parse_height_range(length):
+    """Lee from/to/limit de la query.
+    
+    `length` es el número de bloques visibles. Retorna (inicio, fin de la
+    página, fin del rango pedido), con los fines exclusivos, o None si los
+    parámetros son inválidos.
+    """
+    start = request.args.get('from', 0, type=int)
+    end = request.args.get('to', type=int)
+    limit = request.args.get('limit', 100, type=int)
+    if start < 0 or (end is not None and end < start) or not 1 <= limit <= 1000:
+        return None
+    
+    last = length if end is None else min(end + 1, length)
+    return start, min(start + limit, last), last
+
+def json_with_blocks(data, blocks, key='chain'):
+    """Respuesta JSON de `data` con una lista de bloques ya codificados.
+    
+    Los bytes de cada bloque se insertan tal cual, sin decodificarlos ni
+    volver a serializarlos.
+    """
+    prefix = json.dumps(data, sort_keys=True)[:-1] + (', ' if data else '')
+    body = (prefix + '"%s": [' % key).encode() + b', '.join(blocks) + b']}'
+    return Response(body, mimetype='application/json')
 
 @app.route('/api/chain', methods=['GET'])
+@cached_response()
 def get_chain():
     if not blockchain.is_chain_valid():
         return jsonify({'error': 'Blockchain inválida'}), 500
     
-    return jsonify({
-        'length': len(blockchain.chain),
-        'is_valid': blockchain.is_chain_valid(),
-        'chain': blockchain.get_chain_data()
-    }), 200
+    # Longitud de la instantánea actual: los bloques confirmados mientras se
+    # responde no entran en esta respuesta
+    length = blockchain.snapshot().length
+    data = {
+        'length': length,
+        'is_valid': True,
+        'verified_height': blockchain.verified_height
+    }
+    
+    # Sin parámetros se mantiene la respuesta completa; con from/to/limit se pagina
+    if not any(arg in request.args for arg in ('from', 'to', 'limit')):
+        return json_with_blocks(data, blockchain.iter_encoded_blocks(0, length)), 200
+    
+    height_range = parse_height_range(length)
+    if height_range is None:
+        return jsonify({'error': 'Rango inválido'}), 400
+    
+    start, stop, last = height_range
+    data['next'] = stop if stop < last else None
+    return json_with_blocks(data, blockchain.iter_encoded_blocks(start, stop)), 200
+
+@app.route('/api/chain/stream', methods=['GET'])
+def stream_chain():
+    if not blockchain.is_chain_valid():
+        return jsonify({'error': 'Blockchain inválida'}), 500
+    
+    start = request.args.get('from', 0, type=int)
+    end = request.args.get('to', type=int)
+    length = blockchain.snapshot().length
+    stop = length if end is None else min(end + 1, length)
+    
+    def generate():
+        # Se emite un bloque por fragmento para que la memoria no crezca con la cadena
+        yield b'{"length": %d, "chain": [' % length
+        for i, encoded in enumerate(blockchain.iter_encoded_blocks(start, stop)):
+            yield (b',' if i else b'') + encoded
+        yield b']}'
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+@app.route('/api/block/<int:height>', methods=['GET'])
+def get_block(height):
+    block = blockchain.get_block(height)
+    if block is None:
+        return jsonify({'error': 'Bloque no encontrado'}), 404
+    return Response(block.encode(), mimetype='application/json'), 200
+
+@app.route('/api/block/hash/<block_hash>', methods=['GET'])
+def get_block_by_hash(block_hash):
+    block = blockchain.get_block_by_hash(block_hash)
+    if block is None:
+        return jsonify({'error': 'Bloque no encontrado'}), 404
+    return Response(block.encode(), mimetype='application/json'), 200
+
+@app.route('/api/chain/verify', methods=['POST'])
+def verify_chain():
+    # Recorre toda la cadena: solo para administración
+    if not is_admin():
+        return jsonify({'error': 'No autorizado'}), 403
+    
+    try:
+        result = blockchain.verify_chain()
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(result), 200 if result['valid'] else 500
 
 @app.route('/api/stats', methods=['GET'])
+@cached_response('mempool', 'accounts')
 def get_stats():
-    total_miners = len(blockchain.all_miners)
-    total_balance = sum(blockchain.balances.values())
-    total_blocks = len(blockchain.chain)
+    stats = blockchain.get_stats()
     
     return jsonify({
-        'total_blocks': total_blocks,
-        'total_users': len(users),
-        'total_miners': total_miners,
-        'pending_transactions': len(blockchain.pending_transactions),
-        'total_balance': total_balance,
-        'difficulty': blockchain.difficulty
+        'total_blocks': stats['blocks'],
+        'total_users': accounts.count_users(),
+        'total_miners': stats['miners'],
+        'total_transactions': stats['transactions'],
+        'pending_transactions': stats['pending'],
+        'total_balance': stats['total_supply'],
+        'total_fees': stats['total_fees'],
+        'difficulty': blockchain.difficulty,
+        'target': '%064x' % blockchain.target,
+        'block_time': blockchain.block_time
     }), 200
 
+@app.route('/api/chain/head', methods=['GET'])
+def get_chain_head():
+    return jsonify(blockchain.get_head()), 200
+
+SSE_KEEPALIVE = 15  # Segundos entre comentarios de mantenimiento en /api/events
+
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    # Se continúa tras el último evento recibido si el navegador se reconecta
+    after = request.headers.get('Last-Event-ID', type=int)
+    if after is None:
+        after = request.args.get('since', blockchain.events.last_id, type=int)
+    after = max(after, 0)  # Los identificadores empiezan en 1
+    
+    def generate(after):
+        yield 'retry: 3000\n\n'
+        while True:
+            events = blockchain.events.wait(after, timeout=SSE_KEEPALIVE)
+            if not events:
+                yield ': keepalive\n\n'
+                continue
+            for event_id, event, data in events:
+                yield 'id: %d\nevent: %s\ndata: %s\n\n' % (event_id, event, json.dumps(data))
+                after = event_id
+    
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate(after)), mimetype='text/event-stream',
+                    headers=headers)
+
 HTML_TEMPLATE = '''
 <!DOCTYPE html>
 <html lang="es">
@@ -751,17 +1134,10 @@ HTML_TEMPLATE = '''
 
         async function loadBlockStats() {
             try {
-                const response = await fetch('/api/chain');
+                const response = await fetch('/api/chain/head');
                 const data = await response.json();
                 document.getElementById('blockCount').textContent = data.length;
-            } catch (error) {
-                console.error('Error:', error);
-            }
-
-            try {
-                const response = await fetch('/api/pending-transactions');
-                const data = await response.json();
-                document.getElementById('pendingCount').textContent = data.count;
+                document.getElementById('pendingCount').textContent = data.pending_count;
             } catch (error) {
                 console.error('Error:', error);
             }
@@ -776,14 +1152,26 @@ HTML_TEMPLATE = '''
 
             try {
                 const response = await fetch('/api/mine', { method: 'POST' });
-                const data = await response.json();
+                let data = await response.json();
 
-                if (response.ok) {
+                if (!response.ok) {
+                    showAlert(data.error, 'error');
+                    return;
+                }
+
+                while (data.status === 'pending' || data.status === 'running') {
+                    await new Promise(resolve => setTimeout(resolve, 1000));
+                    const jobResponse = await fetch(`/api/mine/${data.job_id}`);
+                    data = await jobResponse.json();
+                    if (!jobResponse.ok) break;
+                }
+
+                if (data.status === 'completed') {
                     showAlert(`Block ${data.block.index} mined! Reward: ${data.miner_reward.toFixed(2)} coins`, 'success');
                     refreshBalance();
                     loadBlockStats();
                 } else {
-                    showAlert(data.error, 'error');
+                    showAlert(data.error || `Mining ${data.status}`, 'error');
                 }
             } catch (error) {
                 showAlert('Mining error', 'error');
@@ -864,7 +1252,7 @@ Users: ${data.total_users}
 Miners: ${data.total_miners}
 Pending TX: ${data.pending_transactions}
 Total Balance: ${data.total_balance.toFixed(2)} coins
-Difficulty: ${data.difficulty}%`);
+Difficulty: ${data.difficulty.toFixed(2)}`);
                 });
         }
 
@@ -872,7 +1260,7 @@ Difficulty: ${data.difficulty}%`);
             alert(`SILK ROAD
 Blockchain Mining Network
 
-Difficulty: 99%
+Difficulty: adaptive (10s blocks)
 Network Fee: 2%
 Block Reward: 5-50 coins (random)
 
@@ -890,8 +1278,45 @@ Today, reimagined as a modern blockchain network for distributed mining.`);
             }
         });
 
+        function touchesWallet(data) {
+            return currentUser && data.addresses.includes(currentUser.wallet_address);
+        }
+
+        // Avisos del servidor: solo se recarga lo que cambió
+        let events = null;
+        if (window.EventSource) {
+            events = new EventSource('/api/events');
+            events.addEventListener('block', (e) => {
+                const data = JSON.parse(e.data);
+                document.getElementById('blockCount').textContent = data.height + 1;
+                document.getElementById('pendingCount').textContent = data.pending;
+                if (touchesWallet(data) || data.fees > 0) {
+                    refreshBalance();
+                }
+                if (touchesWallet(data)) {
+                    loadHistory();
+                }
+            });
+            events.addEventListener('mempool', (e) => {
+                const data = JSON.parse(e.data);
+                document.getElementById('pendingCount').textContent = data.pending;
+                if (touchesWallet(data)) {
+                    refreshBalance();
+                }
+            });
+            events.addEventListener('resync', () => {
+                if (currentUser) {
+                    refreshBalance();
+                    loadBlockStats();
+                    loadHistory();
+                }
+            });
+        }
+
+        // Sondeo de respaldo mientras no haya conexión de eventos
         setInterval(() => {
-            if (currentUser && !document.getElementById('miningStatus').classList.contains('active')) {
+            const live = events && events.readyState === EventSource.OPEN;
+            if (currentUser && !live && !document.getElementById('miningStatus').classList.contains('active')) {
                 refreshBalance();
                 loadBlockStats();
             }
@@ -901,6 +1326,35 @@ Today, reimagined as a modern blockchain network for distributed mining.`);
 </html>
 '''
 
+@app.route('/api/admin/profile', methods=['POST'])
+def profile_node():
+    if not is_admin():
+        return jsonify({'error': 'No autorizado'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    mode = data.get('mode', 'sample')
+    requests_limit = data.get('requests')
+    seconds = data.get('seconds', MAX_PROFILE_SECONDS if requests_limit else 10)
+    interval_ms = data.get('interval_ms', 5)
+    if mode not in PROFILER.MODES:
+        return jsonify({'error': 'Modo inválido', 'modes': list(PROFILER.MODES)}), 400
+    if not isinstance(seconds, (int, float)) or not 0 < seconds <= MAX_PROFILE_SECONDS:
+        return jsonify({'error': f'seconds debe estar entre 0 y {MAX_PROFILE_SECONDS}'}), 400
+    if requests_limit is not None and (not isinstance(requests_limit, int) or requests_limit < 1):
+        return jsonify({'error': 'requests debe ser un entero positivo'}), 400
+    if not isinstance(interval_ms, (int, float)) or not 1 <= interval_ms <= 1000:
+        return jsonify({'error': 'interval_ms debe estar entre 1 y 1000'}), 400
+    
+    try:
+        report = PROFILER.run(mode, seconds, requests_limit, interval_ms / 1000)
+    except RuntimeError as e:
+        return jsonify({'error': str(e)}), 409
+    return jsonify(report), 200
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(REGISTRY.expose(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/')
 def index():
     return render_template_string(HTML_TEMPLATE)
@@ -908,6 +1362,6 @@ def index():
 if __name__ == '__main__':
     print("Silk Road - Blockchain Mining Network")
     print("http://localhost:5000")
-    print("Difficulty: 99%")
+    print(f"Difficulty: {blockchain.difficulty:.2f}")
     print("Mining started...")
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,303 @@
+"""Benchmarks de las rutas críticas de la blockchain.
+
+Construye una cadena sintética con dificultad mínima y mide:
+
+- Hashrate de `Block.mine_block` a una dificultad real.
+- Rendimiento de `add_transaction` y de la confirmación de bloques.
+- Latencia de `get_transaction_history` y de `is_chain_valid(full=True)`.
+- Latencia de los endpoints principales de Flask a través del cliente de
+  pruebas, con y sin caché de respuestas.
+
+Los resultados se escriben en JSON para comparar ejecuciones:
+
+    python benchmark.py --transactions 100000 --output bench.json
+    python benchmark.py --transactions 100000 --baseline bench.json
+
+Con --baseline se compara cada métrica con la ejecución anterior y se termina
+con código 1 si alguna empeora más de --tolerance.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from blockchain import Block, Blockchain, Transaction
+from mining import Miner, difficulty_to_target
+
+
+TRANSFER_AMOUNT = 0.001  # Cada cartera empieza con al menos 5 monedas de recompensa
+TRANSFERS_PER_WALLET = 2000
+
+
+def latency_stats(samples: List[float]) -> Dict:
+    """Resumen en milisegundos de una lista de duraciones en segundos"""
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(int(p * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean_ms': statistics.fmean(ordered) * 1000,
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': ordered[-1] * 1000
+    }
+
+
+def time_calls(function: Callable[[], object], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def build_chain(transactions: int, block_size: int, data_dir: Optional[str],
+                seed: int) -> Dict:
+    """Genera una cadena con `transactions` transferencias entre carteras sintéticas.
+
+    Se mina con el objetivo máximo y sin reajustes, de modo que cada bloque se
+    resuelve con el primer nonce y el tiempo medido es el de la lógica de la
+    cadena, no el del Proof of Work.
+    """
+    rng = random.Random(seed)
+    blockchain = Blockchain(difficulty=0, retarget_interval=10 ** 9, data_dir=data_dir,
+                            mempool_size=max(block_size * 2, 50000),
+                            max_block_transactions=block_size)
+    wallets = ['0x%040x' % rng.getrandbits(160)
+               for _ in range(max(10, -(-transactions // TRANSFERS_PER_WALLET)))]
+
+    started = time.perf_counter()
+    for wallet in wallets:
+        blockchain.mine_pending_transactions(wallet)
+    funding_seconds = time.perf_counter() - started
+
+    add_seconds = commit_seconds = 0.0
+    remaining = transactions
+    while remaining > 0:
+        batch = min(block_size - 1, remaining)  # Una plaza para la recompensa
+        pending = [Transaction(rng.choice(wallets), rng.choice(wallets), TRANSFER_AMOUNT)
+                   for _ in range(batch)]
+
+        started = time.perf_counter()
+        for transaction in pending:
+            if not blockchain.add_transaction(transaction):
+                raise RuntimeError("Transacción sintética rechazada: saldo insuficiente")
+        add_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        blockchain.mine_pending_transactions(rng.choice(wallets))
+        commit_seconds += time.perf_counter() - started
+        remaining -= batch
+
+    blockchain._indexes_ready.wait()
+    blocks = len(blockchain.chain)
+    return {
+        'blockchain': blockchain,
+        'wallets': wallets,
+        'results': {
+            'chain': {
+                'transactions': transactions,
+                'blocks': blocks,
+                'wallets': len(wallets),
+                'funding_seconds': funding_seconds
+            },
+            'add_transaction': {
+                'seconds': add_seconds,
+                'tx_per_second': transactions / add_seconds if add_seconds else 0.0
+            },
+            'commit_block': {
+                'seconds': commit_seconds,
+                'blocks_per_second': (blocks - len(wallets) - 1) / commit_seconds if commit_seconds else 0.0,
+                'tx_per_second': transactions / commit_seconds if commit_seconds else 0.0
+            }
+        }
+    }
+
+
+def bench_mining(difficulty: float, blocks: int, workers: int) -> Dict:
+    """Hashrate de `Block.mine_block` sobre varios bloques a la dificultad dada"""
+    miner = Miner(workers)
+    target = difficulty_to_target(difficulty)
+    attempts = 0
+    elapsed = 0.0
+    for index in range(1, blocks + 1):
+        block = Block(index, time.time(), [], '0' * 64, target=target)
+        result = block.mine_block(miner)
+        attempts += result.attempts
+        elapsed += result.elapsed
+    return {
+        'difficulty': difficulty,
+        'blocks': blocks,
+        'workers': workers,
+        'attempts': attempts,
+        'seconds': elapsed,
+        'hashes_per_second': attempts / elapsed if elapsed else 0.0
+    }
+
+
+def bench_history(blockchain: Blockchain, wallets: List[str], repeat: int, seed: int) -> Dict:
+    rng = random.Random(seed)
+    return {
+        'page_100': latency_stats(time_calls(
+            lambda: blockchain.get_transaction_history(rng.choice(wallets), 0, 100), repeat)),
+        'full': latency_stats(time_calls(
+            lambda: blockchain.get_transaction_history(rng.choice(wallets)), repeat))
+    }
+
+
+def bench_validation(blockchain: Blockchain, repeat: int) -> Dict:
+    full = time_calls(lambda: blockchain.is_chain_valid(full=True), repeat)
+    incremental = time_calls(blockchain.is_chain_valid, repeat)
+    return {
+        'full': latency_stats(full),
+        'incremental': latency_stats(incremental),
+        'blocks_per_second': len(blockchain.chain) / statistics.fmean(full)
+    }
+
+
+def bench_endpoints(blockchain: Blockchain, wallets: List[str], repeat: int, seed: int) -> Dict:
+    """Latencia de los endpoints de lectura a través del cliente de pruebas de Flask.
+
+    app.py crea su propia cadena y base de cuentas en el directorio actual al
+    importarse, así que se importa desde un directorio temporal y después se
+    sustituye su cadena por la sintética.
+    """
+    import app as server
+    from response_cache import ResponseCache
+
+    server.blockchain = blockchain
+    client = server.app.test_client()
+    rng = random.Random(seed)
+    height = len(blockchain.chain) - 1
+    endpoints = {
+        'chain_head': lambda: '/api/chain/head',
+        'chain_page': lambda: '/api/chain?from=%d&limit=100' % max(height - 99, 0),
+        'block': lambda: '/api/block/%d' % rng.randint(0, height),
+        'stats': lambda: '/api/stats',
+        'balance': lambda: '/api/balance/%s' % rng.choice(wallets),
+        'history': lambda: '/api/history/%s?limit=100' % rng.choice(wallets)
+    }
+
+    results = {}
+    for cache_mode, max_bytes in (('uncached', 0), ('cached', 32 * 1024 * 1024)):
+        server.response_cache = ResponseCache(max_bytes=max_bytes)
+        for name, path in endpoints.items():
+            def request():
+                response = client.get(path())
+                if response.status_code != 200:
+                    raise RuntimeError("%s respondió %d" % (response.request.path, response.status_code))
+            results['%s.%s' % (name, cache_mode)] = latency_stats(time_calls(request, repeat))
+    return results
+
+
+# Dirección en la que mejora cada métrica, para comparar con una ejecución anterior
+HIGHER_IS_BETTER = ('hashes_per_second', 'tx_per_second', 'blocks_per_second')
+LOWER_IS_BETTER = ('mean_ms', 'p50_ms', 'p95_ms')
+
+
+def flatten(results: Dict, prefix: str = '') -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = prefix + key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + '.'))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[Dict]:
+    """Métricas que empeoraron más de `tolerance` (fracción) respecto a la línea base"""
+    regressions = []
+    old = flatten(baseline)
+    for name, value in flatten(current).items():
+        metric = name.rsplit('.', 1)[-1]
+        previous = old.get(name)
+        if not previous:
+            continue
+        change = (value - previous) / previous
+        if (metric in HIGHER_IS_BETTER and change < -tolerance) or \
+                (metric in LOWER_IS_BETTER and change > tolerance):
+            regressions.append({'metric': name, 'baseline': previous,
+                                'current': value, 'change': change})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--transactions', type=int, default=10000,
+                        help='transferencias de la cadena sintética (10k a 1M)')
+    parser.add_argument('--block-size', type=int, default=1000,
+                        help='transacciones por bloque, recompensa incluida')
+    parser.add_argument('--persistent', action='store_true',
+                        help='guardar la cadena en un BlockStore en disco en lugar de en memoria')
+    parser.add_argument('--mining-difficulty', type=float, default=4)
+    parser.add_argument('--mining-blocks', type=int, default=5)
+    parser.add_argument('--mining-workers', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=200,
+                        help='repeticiones de cada medida de latencia')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='archivo JSON de resultados (por defecto, la salida estándar)')
+    parser.add_argument('--baseline', help='JSON de una ejecución anterior con el que comparar')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='empeoramiento relativo tolerado frente a la línea base')
+    args = parser.parse_args(argv)
+    output_path = args.output and os.path.abspath(args.output)
+    baseline_path = args.baseline and os.path.abspath(args.baseline)
+
+    workdir = tempfile.mkdtemp(prefix='blockchain-bench-')
+    os.chdir(workdir)
+    data_dir = os.path.join(workdir, 'chain') if args.persistent else None
+
+    results: Dict = {}
+    # Los mensajes de "Bloque minado" no forman parte del resultado
+    with contextlib.redirect_stdout(io.StringIO()):
+        results['mining'] = bench_mining(args.mining_difficulty, args.mining_blocks,
+                                         args.mining_workers)
+        built = build_chain(args.transactions, args.block_size, data_dir, args.seed)
+        blockchain, wallets = built['blockchain'], built['wallets']
+        results.update(built['results'])
+        results['history'] = bench_history(blockchain, wallets, args.repeat, args.seed)
+        results['is_chain_valid'] = bench_validation(blockchain, max(args.repeat // 20, 3))
+        results['endpoints'] = bench_endpoints(blockchain, wallets, args.repeat, args.seed)
+
+    report = {
+        'meta': {
+            'timestamp': time.time(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'arguments': {key: value for key, value in vars(args).items()
+                          if key not in ('output', 'baseline')}
+        },
+        'results': results
+    }
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        report['regressions'] = compare(results, baseline['results'], args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if output_path:
+        with open(output_path, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    return 1 if report.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,52 +1,314 @@
 import hashlib
 import json
+import os
 import time
 import random
+import sys
+import threading
 from datetime import datetime
-from collections import defaultdict
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict, defaultdict
+from typing import List, Dict, Any, Optional, Callable, Tuple, Iterator
+
+from columnar import TransactionColumns
+from events import EventBus
+from merkle import hash_transaction, merkle_proof, merkle_root
+from storage import BlockStore, read_json, write_json_atomic
+from mempool import Mempool, MempoolMirror
+from metrics import Counter, Gauge, Histogram
+from profiler import PROFILER
+from snapshot import ChainSnapshot, Overlay
+from mining import MAX_TARGET, Miner, MiningResult, difficulty_to_target, target_to_difficulty
+
+BLOCKS_COMMITTED = Counter('blockchain_blocks_committed_total', 'Bloques añadidos a la cadena')
+TRANSACTIONS_CONFIRMED = Counter('blockchain_transactions_confirmed_total',
+                                 'Transacciones incluidas en bloques confirmados (recompensas incluidas)')
+TRANSACTIONS_ACCEPTED = Counter('blockchain_transactions_accepted_total',
+                                'Transacciones aceptadas en las pendientes')
+TRANSACTIONS_REJECTED = Counter('blockchain_transactions_rejected_total',
+                                'Transacciones rechazadas, por motivo', ['reason'])
+TRANSACTIONS_EVICTED = Counter('blockchain_transactions_evicted_total',
+                               'Pendientes descartadas por falta de espacio en el mempool')
+STALE_TEMPLATES = Counter('blockchain_stale_templates_total',
+                          'Bloques minados que se rehicieron porque la punta o las pendientes cambiaron')
+HASHES = Counter('blockchain_hashes_total', 'Intentos de nonce calculados')
+HASHRATE = Gauge('blockchain_last_hashrate', 'Hashes por segundo del último bloque minado')
+MINE_BLOCK_SECONDS = Histogram('blockchain_mine_block_seconds',
+                               'Duración de Block.mine_block', ['found'])
+MINE_PENDING_SECONDS = Histogram('blockchain_mine_pending_seconds',
+                                 'Duración de mine_pending_transactions', ['outcome'])
+
+_REJECTED_BALANCE = TRANSACTIONS_REJECTED.labels('balance')
+_REJECTED_MEMPOOL = TRANSACTIONS_REJECTED.labels('mempool_full')
+
+
+def _to_digest(value: str):
+    """Guarda un hash hexadecimal como sus 32 bytes (el '0' del génesis queda como texto)"""
+    return bytes.fromhex(value) if len(value) == 64 else value
+
+
+def _to_hex(value) -> str:
+    return value.hex() if isinstance(value, bytes) else value
+
 
 class Block:
     """Representa un bloque en la blockchain"""
     
+    # Sin __dict__ por bloque; los hashes se guardan como 32 bytes y se
+    # exponen en hexadecimal a través de propiedades. Un bloque confirmado
+    # guarda además su cabecera (ver `seal`); su codificación completa solo
+    # mientras está en la caché de PersistentChain
+    __slots__ = ('index', 'timestamp', 'transactions', '_previous_hash', 'nonce',
+                 'target', '_merkle_root', '_hash', '_encoded', '_header')
+    
     def __init__(self, index: int, timestamp: float, transactions: List[Dict], 
-                 previous_hash: str, nonce: int = 0):
+                 previous_hash: str, nonce: int = 0, target: int = MAX_TARGET):
+        self._encoded: Optional[bytes] = None
+        self._header: Optional[bytes] = None
         self.index = index
         self.timestamp = timestamp
         self.transactions = transactions
         self.previous_hash = previous_hash
         self.nonce = nonce
+        self.target = target  # Objetivo numérico de 256 bits del Proof of Work
+        self.merkle_root = self.calculate_merkle_root()
         self.hash = self.calculate_hash()
     
-    def calculate_hash(self) -> str:
-        """Calcula el hash SHA-256 del bloque"""
-        block_string = json.dumps({
+    @property
+    def hash(self) -> str:
+        return self._hash.hex()
+    
+    @hash.setter
+    def hash(self, value: str):
+        self._hash = bytes.fromhex(value)
+    
+    @property
+    def digest(self) -> bytes:
+        """Hash del bloque en binario (32 bytes)"""
+        return self._hash
+    
+    @property
+    def previous_hash(self) -> str:
+        return _to_hex(self._previous_hash)
+    
+    @previous_hash.setter
+    def previous_hash(self, value: str):
+        self._previous_hash = _to_digest(value)
+    
+    @property
+    def merkle_root(self) -> str:
+        return self._merkle_root.hex()
+    
+    @merkle_root.setter
+    def merkle_root(self, value: str):
+        self._merkle_root = bytes.fromhex(value)
+    
+    def calculate_merkle_root(self) -> str:
+        """Calcula la raíz de Merkle de las transacciones del bloque"""
+        return merkle_root([hash_transaction(tx) for tx in self.transactions]).hex()
+    
+    def get_merkle_proof(self, position: int) -> List[Dict]:
+        """Prueba de inclusión de la transacción en la posición dada"""
+        return merkle_proof([hash_transaction(tx) for tx in self.transactions], position)
+    
+    def header_fields(self) -> Dict:
+        """Campos de la cabecera que se hashean junto con el nonce"""
+        return {
             'index': self.index,
             'timestamp': self.timestamp,
-            'transactions': self.transactions,
+            'merkle_root': self.merkle_root,
             'previous_hash': self.previous_hash,
-            'nonce': self.nonce
-        }, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+            'target': '%064x' % self.target
+        }
+    
+    def header_bytes(self, recompute: bool = False) -> bytes:
+        """Serializa la cabecera del bloque (todo excepto el nonce).
+        
+        Las transacciones entran solo a través de la raíz de Merkle, así que la
+        cabecera tiene tamaño fijo sea cual sea el número de transacciones.
+        En un bloque sellado se calcula una sola vez, salvo con recompute=True.
+        """
+        if self._header is not None and not recompute:
+            return self._header
+        return json.dumps(self.header_fields(), sort_keys=True).encode()
+    
+    def calculate_hash(self, recompute: bool = False) -> str:
+        """Calcula el hash SHA-256 del bloque (cabecera seguida del nonce)"""
+        return hashlib.sha256(self.header_bytes(recompute) + b'%d' % self.nonce).hexdigest()
+    
+    def meets_target(self) -> bool:
+        """Comprueba que el hash, como entero, no supere el objetivo del bloque"""
+        return int.from_bytes(self._hash, 'big') <= self.target
     
-    def mine_block(self, difficulty: int = 4):
+    def mine_block(self, miner: Optional[Miner] = None,
+                   cancel: Optional[threading.Event] = None,
+                   progress: Optional[Callable[[int], None]] = None) -> MiningResult:
         """Realiza Proof of Work (PoW) minando el bloque"""
-        target = '0' * difficulty
-        while self.hash[:difficulty] != target:
-            self.nonce += 1
-            self.hash = self.calculate_hash()
-        print(f"Bloque minado: {self.hash}")
+        miner = miner or Miner()
+        result = miner.mine(self.header_bytes(), self.target, self.nonce, cancel, progress)
+        MINE_BLOCK_SECONDS.labels('true' if result.found else 'false').observe(result.elapsed)
+        HASHES.inc(result.attempts)
+        HASHRATE.set(result.hashrate)
+        if result.found:
+            self.nonce = result.nonce
+            self._hash = result.digest
+            print(f"Bloque minado: {self.hash} ({result.hashrate:.0f} H/s)")
+        return result
+    
+    def to_dict(self) -> Dict:
+        return {
+            'index': self.index,
+            'timestamp': self.timestamp,
+            'hash': self.hash,
+            'previous_hash': self.previous_hash,
+            'nonce': self.nonce,
+            'target': '%064x' % self.target,
+            'merkle_root': self.merkle_root,
+            'transactions': self.transactions if isinstance(self.transactions, list)
+                            else list(self.transactions)
+        }
+    
+    def encode(self, keep: bool = False) -> bytes:
+        """Serialización canónica del bloque completo (JSON con claves ordenadas).
+        
+        Con keep=True los bytes se guardan en el bloque para las siguientes
+        llamadas; solo lo hace PersistentChain, cuya caché está acotada. En una
+        cadena en memoria duplicarían cada transacción confirmada.
+        """
+        if self._encoded is not None:
+            return self._encoded
+        encoded = json.dumps(self.to_dict(), sort_keys=True).encode()
+        if keep:
+            self._encoded = encoded
+        return encoded
+    
+    def seal(self):
+        """Fija la cabecera de un bloque que ya no va a cambiar.
+        
+        Se llama al confirmar el bloque; desde entonces la verificación
+        incremental del hash reutiliza la cabecera.
+        """
+        if self._header is None:
+            self._header = self.header_bytes()
+    
+    @classmethod
+    def decode(cls, encoded: bytes) -> 'Block':
+        """Reconstruye un bloque almacenado, ya sellado con los bytes leídos"""
+        block = cls.from_dict(json.loads(encoded))
+        block._encoded = encoded
+        block.seal()
+        return block
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Block':
+        """Reconstruye un bloque conservando el hash y la raíz almacenados.
+        
+        No se recalculan: así la validación detecta si los datos guardados
+        fueron alterados.
+        """
+        block = cls.__new__(cls)
+        block._encoded = None
+        block._header = None
+        block.index = data['index']
+        block.timestamp = data['timestamp']
+        block.transactions = data['transactions']
+        block.previous_hash = data['previous_hash']
+        block.nonce = data['nonce']
+        block.target = int(data['target'], 16)
+        block.merkle_root = data['merkle_root']
+        block.hash = data['hash']
+        return block
+
+
+def compact_transactions(block: Block):
+    """Pasa las transacciones de un bloque confirmado a su representación por columnas"""
+    if isinstance(block.transactions, list):
+        columns = TransactionColumns.from_dicts(block.transactions)
+        if columns is not None:
+            block.transactions = columns
+
+
+class PersistentChain:
+    """Secuencia de bloques respaldada por un BlockStore.
+    
+    Se comporta como la lista `Blockchain.chain`, pero los bloques se leen y
+    decodifican bajo demanda; en memoria solo se guarda una caché de los
+    usados más recientemente.
+    """
+    
+    def __init__(self, store: BlockStore, cache_size: int = 1024, columnar: bool = False):
+        self.store = store
+        self.cache_size = cache_size
+        self.columnar = columnar  # Guardar en caché las transacciones por columnas
+        self._cache: "OrderedDict[int, Block]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self.store)
+    
+    def __getitem__(self, height: int) -> Block:
+        if height < 0:
+            height += len(self.store)
+        if not 0 <= height < len(self.store):
+            raise IndexError("Altura de bloque fuera de rango")
+        
+        with self._lock:
+            block = self._cache.get(height)
+            if block is not None:
+                self._cache.move_to_end(height)
+                return block
+        
+        block = self.load(height)
+        self._remember(height, block)
+        return block
+    
+    def __iter__(self) -> Iterator[Block]:
+        for height in range(len(self.store)):
+            yield self[height]
+    
+    def encoded(self, height: int) -> bytes:
+        """Codificación de un bloque sin decodificarlo ni desplazar la caché.
+        
+        Los bloques guardados ya están en su forma canónica: si no está en
+        caché se retornan tal cual los bytes del almacén.
+        """
+        with self._lock:
+            block = self._cache.get(height)
+        if block is not None:
+            return block.encode()
+        return self.store.read(height)
+    
+    def load(self, height: int) -> Block:
+        """Lee un bloque del almacén sin pasar por la caché"""
+        block = Block.decode(self.store.read(height))
+        if self.columnar:
+            compact_transactions(block)
+        return block
+    
+    def append(self, block: Block):
+        block.seal()
+        self.store.append(block.encode(keep=True))
+        self._remember(block.index, block)
+    
+    def _remember(self, height: int, block: Block):
+        with self._lock:
+            self._cache[height] = block
+            self._cache.move_to_end(height)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
 
 
 class Transaction:
     """Representa una transacción"""
     
+    __slots__ = ('sender', 'receiver', 'amount', 'timestamp', 'commission')
+    
     def __init__(self, sender: str, receiver: str, amount: float, timestamp: Optional[float] = None):
-        self.sender = sender
-        self.receiver = receiver
-        self.amount = amount
+        # Direcciones internadas: todas las transacciones comparten la misma cadena
+        self.sender = sys.intern(sender)
+        self.receiver = sys.intern(receiver)
+        self.amount = float(amount)
         self.timestamp = timestamp or time.time()
-        self.commission = amount * 0.02  # Comisión del 2%
+        self.commission = self.amount * 0.02  # Comisión del 2%
     
     def to_dict(self) -> Dict:
         return {
@@ -61,33 +323,314 @@ class Transaction:
 class Blockchain:
     """Implementa la blockchain con minería y gestión de transacciones"""
     
-    def __init__(self, difficulty: int = 99):
+    def __init__(self, difficulty: float = 4, mining_workers: int = 1,
+                 block_time: float = 10.0, retarget_interval: int = 10,
+                 data_dir: Optional[str] = None, checkpoint_interval: int = 100,
+                 mempool_size: int = 50000, max_block_transactions: int = 1000,
+                 max_block_bytes: Optional[int] = 1000000,
+                 columnar_transactions: bool = False, read_only: bool = False):
+        if retarget_interval < 2:
+            raise ValueError("El intervalo de reajuste debe ser de al menos 2 bloques")
+        if read_only and not data_dir:
+            raise ValueError("Una cadena de solo lectura necesita data_dir")
+        
+        # Con data_dir los bloques se guardan en disco a medida que se confirman.
+        # Con read_only otro proceso es el que mina y escribe en data_dir: esta
+        # instancia solo sirve lecturas y se pone al día con `sync`
+        self.data_dir = data_dir
+        self.read_only = read_only
+        self.checkpoint_interval = checkpoint_interval  # Bloques entre copias del estado
+        self.store: Optional[BlockStore] = None
         self.chain: List[Block] = []
-        self.pending_transactions: List[Transaction] = []
-        self.difficulty = difficulty
+        if data_dir:
+            self.store = BlockStore(data_dir, read_only=read_only)
+            self.chain = PersistentChain(self.store, columnar=columnar_transactions)
+        
+        # Transacciones pendientes ordenadas por comisión, con tamaño máximo; en
+        # solo lectura, copia de las reservas del mempool del proceso escritor
+        self.pending_transactions = MempoolMirror() if read_only else Mempool(mempool_size)
+        self.max_block_transactions = max_block_transactions
+        self.max_block_bytes = max_block_bytes
+        # Guardar las transacciones confirmadas en arrays en lugar de diccionarios
+        self.columnar_transactions = columnar_transactions
+        self.initial_target = difficulty_to_target(difficulty)
+        self.block_time = block_time  # Segundos deseados entre bloques
+        self.retarget_interval = retarget_interval  # Bloques entre reajustes
+        self.miner = Miner(mining_workers)  # Procesos usados para el Proof of Work
+        # Único escritor: toda modificación de la cadena, los saldos o las
+        # pendientes se hace con este cerrojo. Los lectores no lo toman: usan
+        # la instantánea publicada tras cada bloque (ver `snapshot`)
+        self._commit_lock = threading.Lock()
+        self._verify_lock = threading.Lock()
+        self._full_verify_lock = threading.Lock()  # Una revalidación completa a la vez
+        self.verified_height = 0  # Altura hasta la que la cadena ya está validada
+        self.last_full_verification: Optional[Dict] = None
         self.balances: Dict[str, float] = defaultdict(float)
         self.all_miners: set = set()  # Registro de todos los mineros
+        # Comisiones acumuladas por minero desde el génesis; cada minero guarda
+        # el valor que tenía la última vez que cobró y reclama la diferencia
+        self.reward_per_miner = 0.0
+        self.miner_checkpoints: Dict[str, float] = {}
+        # Agregados de la red, actualizados al confirmar cada bloque
+        self.total_supply = 0.0  # Monedas emitidas como recompensa de minería
+        self.total_fees = 0.0  # Comisiones pagadas
+        self.transaction_count = 0  # Transacciones confirmadas (incluidas recompensas)
+        # Posiciones (bloque, transacción) en las que aparece cada dirección
+        self.address_index: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.block_heights: Dict[bytes, int] = {}  # Hash binario de bloque -> altura
+        self._indexes_ready = threading.Event()
+        # Avisos de bloques nuevos y cambios en las pendientes para los clientes
+        self.events = EventBus()
+        # Direcciones cuyo saldo o punto de cobro cambió desde la última instantánea
+        self._dirty_accounts: set = set()
+        self._snapshot: Optional[ChainSnapshot] = None
+        self._commit_generation = 0
         
-        # Crear bloque génesis
-        self.create_genesis_block()
+        if len(self.chain) > 0:
+            self.restore_state()
+        elif read_only:
+            raise ValueError("No hay ninguna cadena en %s" % data_dir)
+        else:
+            # Crear bloque génesis
+            self.create_genesis_block()
+            self._indexes_ready.set()
+        # Con cerrojo: la reconstrucción de índices puede estar publicando a la vez
+        with self._commit_lock:
+            self._publish_snapshot(full=True)
     
     def create_genesis_block(self):
         """Crea el primer bloque de la blockchain"""
-        genesis_block = Block(0, time.time(), [], "0")
-        genesis_block.mine_block(self.difficulty)
+        genesis_block = Block(0, time.time(), [], "0", target=self.initial_target)
+        genesis_block.mine_block(self.miner)
+        genesis_block.seal()
         self.chain.append(genesis_block)
+        self.block_heights[genesis_block.digest] = 0
+    
+    def restore_state(self):
+        """Reabre una cadena persistida sin recorrerla entera.
+        
+        Comprueba el bloque final, carga la última copia del estado (saldos,
+        mineros) y aplica solo los bloques posteriores a ella. Los índices por
+        dirección y por hash se reconstruyen en segundo plano.
+        """
+        self.initial_target = self.chain[0].target
+        
+        state = read_json(self._checkpoint_path(), {})
+        if self.read_only:
+            # El escritor pudo añadir bloques y guardar una copia más reciente
+            # desde que se abrió el almacén; la copia nunca va por delante del registro
+            self.store.refresh()
+        
+        tip = self.get_latest_block()
+        if tip.hash != tip.calculate_hash() or not tip.meets_target():
+            raise ValueError("El último bloque del registro no es válido")
+        
+        height = state.get('height', 0)
+        self.balances.update(state.get('balances', {}))
+        self.all_miners.update(state.get('all_miners', []))
+        self.reward_per_miner = state.get('reward_per_miner', 0.0)
+        self.miner_checkpoints.update(state.get('miner_checkpoints', {}))
+        self.total_supply = state.get('total_supply', 0.0)
+        self.total_fees = state.get('total_fees', 0.0)
+        self.transaction_count = state.get('transaction_count', 0)
+        self.verified_height = min(state.get('verified_height', 0), len(self.chain) - 1)
+        
+        for block_index in range(height + 1, len(self.chain)):
+            self.replay_block(self.chain[block_index])
+        
+        threading.Thread(target=self._rebuild_indexes, args=(len(self.chain),),
+                         daemon=True, name='index-rebuild').start()
+    
+    def replay_block(self, block: Block):
+        """Aplica un bloque ya confirmado, dando de alta a su minero como al confirmarlo"""
+        reward = next((tx for tx in block.transactions if tx['sender'] == 'SISTEMA'), None)
+        if reward is not None:
+            self.register_miner(reward['receiver'])
+        self.apply_block(block)
+    
+    def sync(self, mempool_update: Optional[Callable[[], None]] = None) -> int:
+        """Aplica los bloques que el proceso escritor añadió al registro (solo lectura).
+        
+        `mempool_update`, si se da, actualiza la copia de las reservas del
+        mempool dentro de la misma confirmación que los bloques, así que los
+        saldos disponibles nunca combinan una altura con las reservas de
+        otra. Retorna el número de bloques nuevos.
+        """
+        if not self.read_only:
+            raise RuntimeError("Solo una cadena de solo lectura se sincroniza desde el registro")
+        with self._commit_lock:
+            start = len(self.chain)
+            self.store.refresh()
+            stop = len(self.chain)
+            if start == stop and mempool_update is None:
+                return 0
+            
+            for height in range(start, stop):
+                block = self.chain[height]
+                self.replay_block(block)
+                self.block_heights[block.digest] = height
+                self.index_block(block)
+            
+            # Impar solo mientras cambian a la vez las reservas y la instantánea
+            self._commit_generation += 1
+            try:
+                if mempool_update is not None:
+                    mempool_update()
+                if stop > start:
+                    self._publish_snapshot()
+            finally:
+                self._commit_generation += 1
+        return stop - start
+    
+    def _rebuild_indexes(self, stop: int):
+        """Indexa los bloques [0, stop) y los fusiona con los confirmados desde el arranque"""
+        address_index: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        block_heights: Dict[bytes, int] = {}
+        for height in range(stop):
+            block = self.chain.load(height)
+            block_heights[block.digest] = height
+            for position, tx_dict in enumerate(block.transactions):
+                address_index[tx_dict['sender']].append((height, position))
+                if tx_dict['receiver'] != tx_dict['sender']:
+                    address_index[tx_dict['receiver']].append((height, position))
+        
+        with self._commit_lock:
+            for address, positions in self.address_index.items():
+                address_index[address].extend(positions)
+            block_heights.update(self.block_heights)
+            self.address_index = address_index
+            self.block_heights = block_heights
+            self._publish_snapshot()
+            self._indexes_ready.set()
+    
+    def _checkpoint_path(self) -> str:
+        return os.path.join(self.data_dir, 'state.json')
+    
+    def save_checkpoint(self):
+        """Guarda en disco el estado derivado de la cadena hasta el último bloque"""
+        if self.store is None or self.read_only:
+            return
+        with self._commit_lock:
+            write_json_atomic(self._checkpoint_path(), {
+                'height': len(self.chain) - 1,
+                'verified_height': self.verified_height,
+                'balances': dict(self.balances),
+                'all_miners': sorted(self.all_miners),
+                'reward_per_miner': self.reward_per_miner,
+                'miner_checkpoints': self.miner_checkpoints,
+                'total_supply': self.total_supply,
+                'total_fees': self.total_fees,
+                'transaction_count': self.transaction_count
+            })
+    
+    def close(self):
+        """Guarda el estado (salvo en solo lectura), cierra el almacén de bloques y detiene el minero"""
+        self.miner.close()
+        if self.store is not None:
+            self.save_checkpoint()
+            self.store.close()
     
     def get_latest_block(self) -> Block:
         """Retorna el último bloque de la cadena"""
         return self.chain[-1]
     
+    @property
+    def target(self) -> int:
+        """Objetivo numérico que debe cumplir el próximo bloque"""
+        return self.expected_target(len(self.chain))
+    
+    @property
+    def difficulty(self) -> float:
+        """Dificultad actual expresada en ceros hexadecimales equivalentes"""
+        return target_to_difficulty(self.target)
+    
+    def expected_target(self, height: int) -> int:
+        """Calcula el objetivo que corresponde al bloque de la altura dada.
+        
+        Cada `retarget_interval` bloques el objetivo se escala según el tiempo
+        real que tardaron los últimos bloques frente a `block_time`, limitando
+        el ajuste a un factor 4 en cada sentido.
+        """
+        if height == 0:
+            return self.initial_target
+        
+        previous_target = self.chain[height - 1].target
+        if height % self.retarget_interval != 0:
+            return previous_target
+        
+        first = self.chain[height - self.retarget_interval]
+        last = self.chain[height - 1]
+        expected_ms = int((self.retarget_interval - 1) * self.block_time * 1000)
+        actual_ms = int((last.timestamp - first.timestamp) * 1000)
+        actual_ms = min(max(actual_ms, expected_ms // 4), expected_ms * 4)
+        
+        new_target = previous_target * actual_ms // expected_ms
+        return min(max(new_target, 1), MAX_TARGET)
+    
+    def _check_writable(self):
+        if self.read_only:
+            raise RuntimeError("La cadena está abierta en solo lectura")
+    
     def add_transaction(self, transaction: Transaction) -> bool:
         """Añade una transacción pendiente si es válida"""
-        if not self.is_valid_transaction(transaction):
-            return False
+        self._check_writable()
+        # Validar y reservar bajo el mismo cerrojo para que dos envíos
+        # simultáneos no puedan gastar el mismo saldo
+        with self._commit_lock:
+            self.claim_rewards(transaction.sender)
+            if not self.is_valid_transaction(transaction):
+                _REJECTED_BALANCE.inc()
+                return False
+            accepted, evicted = self.pending_transactions.add(transaction)
+            if accepted:
+                self._publish_mempool([transaction], evicted)
+            else:
+                _REJECTED_MEMPOOL.inc()
+        return accepted
+    
+    def add_transactions(self, transactions: List[Transaction]) -> List[bool]:
+        """Añade un lote de transacciones de una sola vez.
         
-        self.pending_transactions.append(transaction)
-        return True
+        Se validan en orden bajo un único cerrojo, de modo que cada una se
+        comprueba contra el saldo disponible que dejan las anteriores del lote.
+        Retorna, para cada transacción, si fue aceptada.
+        """
+        self._check_writable()
+        results = []
+        added: List[Transaction] = []
+        evicted: List[Transaction] = []
+        with self._commit_lock:
+            for transaction in transactions:
+                self.claim_rewards(transaction.sender)
+                accepted = False
+                if self.is_valid_transaction(transaction):
+                    accepted, dropped = self.pending_transactions.add(transaction)
+                    evicted.extend(dropped)
+                    if not accepted:
+                        _REJECTED_MEMPOOL.inc()
+                else:
+                    _REJECTED_BALANCE.inc()
+                if accepted:
+                    added.append(transaction)
+                results.append(accepted)
+            if added:
+                self._publish_mempool(added, evicted)
+        return results
+    
+    def _publish_mempool(self, added: List[Transaction], evicted: List[Transaction]):
+        """Avisa de un cambio en las pendientes y de qué saldos disponibles afecta"""
+        TRANSACTIONS_ACCEPTED.inc(len(added))
+        if evicted:
+            TRANSACTIONS_EVICTED.inc(len(evicted))
+        addresses = {tx.sender for tx in added} | {tx.sender for tx in evicted}
+        self.events.publish('mempool', {
+            'pending': len(self.pending_transactions),
+            'added': len(added),
+            'evicted': len(evicted),
+            'addresses': sorted(addresses),
+            # Reservas actuales de esas direcciones, para las réplicas de solo lectura
+            'reserved': {address: self.pending_transactions.reserved(address) for address in addresses}
+        })
     
     def is_valid_transaction(self, transaction: Transaction) -> bool:
         """Valida que la transacción sea válida"""
@@ -95,113 +638,426 @@ class Blockchain:
         if transaction.sender == "SISTEMA":
             return transaction.amount > 0
         
-        # Las transacciones normales deben tener saldo suficiente
-        required_amount = transaction.amount + transaction.commission
-        return self.balances[transaction.sender] >= required_amount
+        # Las transacciones normales deben tener saldo disponible suficiente,
+        # descontando lo ya comprometido en transacciones pendientes. Se valida
+        # contra el estado vivo, no la instantánea: se llama con el cerrojo tomado
+        sender = transaction.sender
+        available = (self.balances.get(sender, 0.0) + self.get_unclaimed_rewards(sender)
+                     - self.pending_transactions.reserved(sender))
+        return available >= transaction.amount + transaction.commission
     
-    def mine_pending_transactions(self, miner_address: str) -> Optional[Block]:
-        """Mina las transacciones pendientes y añade el bloque a la cadena"""
+    def mine_pending_transactions(self, miner_address: str,
+                                  cancel: Optional[threading.Event] = None,
+                                  progress: Optional[Callable[[int], None]] = None,
+                                  on_result: Optional[Callable[[MiningResult], None]] = None) -> Optional[Block]:
+        """Mina las transacciones pendientes y añade el bloque a la cadena.
         
-        # Registrar minero
-        self.all_miners.add(miner_address)
+        Retorna None si la minería se cancela antes de encontrar un nonce. Si
+        otro bloque se confirma mientras se mina, o alguna transacción de la
+        plantilla se descarta del mempool, se rehace la plantilla y se vuelve
+        a minar. `on_result` recibe el
+        resultado (con las estadísticas por trabajador) de cada búsqueda.
+        """
+        attempts = 0
+        started = time.perf_counter()
         
-        # Recompensa aleatoria entre 5 y 50
-        mining_reward = random.uniform(5, 50)
+        while True:
+            new_block, included = self.prepare_block(miner_address)
+            
+            # Minar el bloque
+            report = (lambda n: progress(attempts + n)) if progress else None
+            with PROFILER.phase('pow'):
+                result = new_block.mine_block(self.miner, cancel, report)
+            attempts += result.attempts
+            if on_result:
+                on_result(result)
+            if not result.found:
+                MINE_PENDING_SECONDS.labels('cancelled').observe(time.perf_counter() - started)
+                return None
+            
+            if self.commit_block(new_block, included, miner_address):
+                MINE_PENDING_SECONDS.labels('committed').observe(time.perf_counter() - started)
+                return new_block
+            STALE_TEMPLATES.inc()
+    
+    def prepare_block(self, miner_address: str) -> Tuple[Block, List[Transaction]]:
+        """Construye el bloque candidato con las transacciones pendientes.
         
-        # Recompensa de minería para el minero
-        mining_transaction = Transaction("SISTEMA", miner_address, mining_reward)
-        self.pending_transactions.insert(0, mining_transaction)
+        No modifica el estado de la cadena: retorna el bloque sin minar y las
+        transacciones pendientes que incluye, para confirmarlas con commit_block.
+        """
+        self._check_writable()
+        with self._commit_lock, PROFILER.phase('select'):
+            # Plantilla: las transacciones de mayor comisión hasta el límite del bloque
+            included = self.pending_transactions.select(self.max_block_transactions,
+                                                        self.max_block_bytes)
+            previous_hash = self.get_latest_block().hash
+            index = len(self.chain)
+            target = self.expected_target(index)
         
-        # Distribuir comisiones a todos los mineros
-        total_commission = sum(tx.commission for tx in self.pending_transactions 
-                              if tx.sender != "SISTEMA")
+        with PROFILER.phase('reward'):
+            # Recompensa aleatoria entre 5 y 50
+            mining_reward = random.uniform(5, 50)
+            
+            # Recompensa de minería para el minero
+            mining_transaction = Transaction("SISTEMA", miner_address, mining_reward)
+            block_transactions = [mining_transaction] + included
         
-        if total_commission > 0 and len(self.all_miners) > 0:
-            commission_per_miner = total_commission / len(self.all_miners)
-            for miner in self.all_miners:
-                commission_tx = Transaction(
-                    "COMISIONES",
-                    miner,
-                    commission_per_miner
-                )
-                self.pending_transactions.append(commission_tx)
+        # Las comisiones no se pagan con transacciones en el bloque: se reparten
+        # entre los mineros a través de reward_per_miner al confirmarlo
         
         # Crear nuevo bloque
-        new_block = Block(
-            len(self.chain),
-            time.time(),
-            [tx.to_dict() for tx in self.pending_transactions],
-            self.get_latest_block().hash
-        )
-        
-        # Minar el bloque
-        new_block.mine_block(self.difficulty)
-        
-        # Actualizar balances
-        for tx_dict in new_block.transactions:
-            tx = Transaction(
-                tx_dict['sender'],
-                tx_dict['receiver'],
-                tx_dict['amount']
+        with PROFILER.phase('block_build'):
+            new_block = Block(
+                index,
+                time.time(),
+                [tx.to_dict() for tx in block_transactions],
+                previous_hash,
+                target=target
             )
+        return new_block, included
+    
+    def commit_block(self, new_block: Block, included: List[Transaction],
+                     miner_address: str) -> bool:
+        """Añade un bloque minado a la cadena y aplica sus transacciones.
+        
+        Retorna False si la punta de la cadena cambió desde que se preparó el
+        bloque o si alguna de sus transacciones salió del mempool mientras se
+        minaba (descartada para hacer sitio a otras de más comisión: su saldo
+        ya no está reservado y pudo gastarse), en cuyo caso no se modifica nada.
+        """
+        self._check_writable()
+        with self._commit_lock:
+            if new_block.previous_hash != self.get_latest_block().hash:
+                return False
+            if any(tx not in self.pending_transactions for tx in included):
+                return False
             
-            if tx.sender != "SISTEMA" and tx.sender != "COMISIONES":
-                self.balances[tx.sender] -= tx.amount
-                self.balances[tx.sender] -= tx.commission
-            else:
-                self.balances[tx.sender] -= 0  # SISTEMA no pierde saldo
+            # Registrar minero
+            with PROFILER.phase('commissions'):
+                self.register_miner(miner_address)
+            
+            # Hasta publicar la instantánea, las lecturas no ven estos cambios
+            self.apply_block(new_block)
+            
+            # Añadir bloque a la cadena (y al registro en disco, si lo hay)
+            with PROFILER.phase('append'):
+                new_block.seal()
+                self.chain.append(new_block)
+                if self.columnar_transactions:
+                    compact_transactions(new_block)
+            with PROFILER.phase('index'):
+                self.block_heights[new_block.digest] = new_block.index
+                self.index_block(new_block)
+            
+            # Impar mientras la instantánea y las reservas del mempool no
+            # corresponden al mismo bloque; no incluye la escritura en disco
+            self._commit_generation += 1
+            try:
+                # Limpiar solo las transacciones incluidas; las que llegaron
+                # durante la minería siguen pendientes para el próximo bloque
+                with PROFILER.phase('mempool'):
+                    self.pending_transactions.remove(included)
+                self._publish_snapshot()
+            finally:
+                self._commit_generation += 1
+            self._publish_block(new_block)
+            BLOCKS_COMMITTED.inc()
+            TRANSACTIONS_CONFIRMED.inc(len(new_block.transactions))
+        
+        if self.store is not None and new_block.index % self.checkpoint_interval == 0:
+            with PROFILER.phase('checkpoint'):
+                self.save_checkpoint()
+        return True
+    
+    def _publish_block(self, block: Block):
+        """Avisa de un bloque confirmado con las direcciones cuyo saldo cambió"""
+        addresses = set()
+        senders = set()
+        fees = 0.0
+        for tx_dict in block.transactions:
+            if tx_dict['sender'] != 'SISTEMA':
+                senders.add(tx_dict['sender'])
+                fees += tx_dict['commission']
+            addresses.add(tx_dict['receiver'])
+        addresses |= senders
+        self.events.publish('block', {
+            'height': block.index,
+            'hash': block.hash,
+            'transactions': len(block.transactions),
+            'fees': fees,  # Si es mayor que cero, cambió el saldo de todos los mineros
+            'addresses': sorted(addresses),
+            'pending': len(self.pending_transactions),
+            # Reservas de los remitentes tras retirar sus transacciones del mempool
+            'reserved': {sender: self.pending_transactions.reserved(sender) for sender in senders}
+        })
+    
+    def apply_block(self, block: Block):
+        """Actualiza los saldos con las transacciones de un bloque y reparte sus comisiones"""
+        fees = 0.0
+        dirty = self._dirty_accounts
+        with PROFILER.phase('balance_apply'):
+            for tx_dict in block.transactions:
+                sender = tx_dict['sender']
+                amount = tx_dict['amount']
+                dirty.add(sender)
+                dirty.add(tx_dict['receiver'])
+                
+                if sender != "SISTEMA":
+                    self.balances[sender] -= amount
+                    self.balances[sender] -= tx_dict['commission']
+                    fees += tx_dict['commission']
+                else:
+                    # SISTEMA no pierde saldo: emite la recompensa de minería
+                    self.total_supply += amount
+                
+                self.balances[tx_dict['receiver']] += amount
             
-            self.balances[tx.receiver] += tx.amount
+            self.transaction_count += len(block.transactions)
+            self.total_fees += fees
         
-        # Añadir bloque a la cadena
-        self.chain.append(new_block)
+        # Las comisiones se reparten en O(1) con el acumulador
+        with PROFILER.phase('commissions'):
+            if fees > 0 and self.all_miners:
+                self.reward_per_miner += fees / len(self.all_miners)
+    
+    def register_miner(self, address: str):
+        """Da de alta a un minero; participa en el reparto desde el bloque actual"""
+        if address not in self.all_miners:
+            self.all_miners.add(address)
+            self.miner_checkpoints[address] = self.reward_per_miner
+            self._dirty_accounts.add(address)
+    
+    def get_unclaimed_rewards(self, address: str) -> float:
+        """Comisiones que corresponden al minero y aún no se sumaron a su saldo"""
+        checkpoint = self.miner_checkpoints.get(address)
+        if checkpoint is None:
+            return 0.0
+        return self.reward_per_miner - checkpoint
+    
+    def claim_rewards(self, address: str) -> float:
+        """Suma al saldo las comisiones pendientes de cobro del minero"""
+        owed = self.get_unclaimed_rewards(address)
+        if owed > 0:
+            self.balances[address] += owed
+            self.miner_checkpoints[address] = self.reward_per_miner
+            self._dirty_accounts.add(address)
+        return owed
+    
+    def register_wallet(self, address: str):
+        """Da de alta una dirección con saldo cero"""
+        with self._commit_lock:
+            self.balances.setdefault(address, 0.0)
+    
+    def snapshot(self) -> ChainSnapshot:
+        """Última instantánea publicada; leerla no toma ningún cerrojo"""
+        return self._snapshot
+    
+    def _publish_snapshot(self, full: bool = False):
+        """Publica una instantánea con el estado actual (con el cerrojo tomado).
         
-        # Limpiar transacciones pendientes
-        self.pending_transactions = []
+        Solo se copian las cuentas que cambiaron desde la anterior; con
+        full=True se parte de todas.
+        """
+        if full or self._snapshot is None:
+            addresses = set(self.balances) | set(self.miner_checkpoints)
+            accounts = Overlay()
+        else:
+            addresses = self._dirty_accounts
+            accounts = self._snapshot.accounts
+        if addresses:
+            accounts = accounts.update({
+                address: (self.balances.get(address, 0.0), self.miner_checkpoints.get(address))
+                for address in addresses
+            })
+        self._dirty_accounts = set()
+        self._snapshot = ChainSnapshot(
+            len(self.chain), self.get_latest_block(), self.chain, accounts,
+            self.reward_per_miner, self.address_index, len(self.all_miners),
+            self.transaction_count, self.total_supply, self.total_fees)
+    
+    def get_mempool_state(self) -> Dict:
+        """Reservas de todas las direcciones junto con la altura y el último evento.
         
-        return new_block
+        Se leen a la vez, con el cerrojo tomado: una réplica que cargue este
+        estado y siga los eventos posteriores a `event_id` no pierde ningún cambio.
+        """
+        with self._commit_lock:
+            return {
+                'height': len(self.chain) - 1,
+                'event_id': self.events.last_id,
+                'pending': len(self.pending_transactions),
+                'reserved': self.pending_transactions.reservations()
+            }
+    
+    def get_stats(self) -> Dict:
+        """Estadísticas de la red a partir de los agregados mantenidos, en O(1)"""
+        snapshot = self._snapshot
+        return {
+            'blocks': snapshot.length,
+            'transactions': snapshot.transaction_count,
+            'miners': snapshot.miners,
+            'total_supply': snapshot.total_supply,
+            'total_fees': snapshot.total_fees,
+            'pending': len(self.pending_transactions)
+        }
+    
+    def get_head(self) -> Dict:
+        """Resumen de la punta de la cadena"""
+        snapshot = self._snapshot
+        return {
+            'height': snapshot.height,
+            'length': snapshot.length,
+            'tip_hash': snapshot.tip_hash,
+            'timestamp': snapshot.tip_timestamp,
+            'pending_count': len(self.pending_transactions)
+        }
     
     def get_balance(self, address: str) -> float:
-        """Obtiene el saldo de una dirección"""
-        return self.balances[address]
+        """Obtiene el saldo de una dirección (incluidas las comisiones por cobrar)"""
+        return self._snapshot.balance(address)
     
-    def get_transaction_history(self, address: str) -> List[Dict]:
-        """Obtiene el historial de transacciones de una dirección"""
-        history = []
-        for block in self.chain:
-            for tx_dict in block.transactions:
-                if tx_dict['sender'] == address or tx_dict['receiver'] == address:
-                    tx_dict['block_index'] = block.index
-                    history.append(tx_dict)
-        return history
-    
-    def is_chain_valid(self) -> bool:
-        """Valida la integridad de toda la blockchain"""
-        for i in range(1, len(self.chain)):
-            current_block = self.chain[i]
-            previous_block = self.chain[i - 1]
-            
-            # Verificar hash del bloque actual
-            if current_block.hash != current_block.calculate_hash():
-                return False
-            
-            # Verificar hash anterior
-            if current_block.previous_hash != previous_block.hash:
-                return False
+    def get_available_balance(self, address: str) -> float:
+        """Saldo confirmado menos lo reservado por sus transacciones pendientes"""
+        # Combina la instantánea con las reservas vivas: si se leen mientras
+        # una confirmación cambia ambas (sin disco ni minería) se repite la lectura
+        while True:
+            generation = self._commit_generation
+            snapshot = self._snapshot
+            reserved = self.pending_transactions.reserved(address)
+            if generation % 2 == 0 and generation == self._commit_generation:
+                return snapshot.balance(address) - reserved
+            time.sleep(0)
+    
+    def get_transaction_history(self, address: str, cursor: int = 0,
+                                limit: Optional[int] = None) -> List[Dict]:
+        """Obtiene el historial de transacciones de una dirección.
+        
+        Usa el índice por dirección, así que el coste depende solo de la
+        actividad de la billetera. `cursor` es la posición desde la que empezar
+        y `limit` el máximo de transacciones a retornar. Se retornan copias:
+        los datos de los bloques no se modifican.
+        """
+        self._indexes_ready.wait()
+        return self._snapshot.history(address, cursor, limit)
+    
+    def get_history_length(self, address: str) -> int:
+        """Número de transacciones en las que participa una dirección"""
+        self._indexes_ready.wait()
+        return self._snapshot.history_length(address)
+    
+    def index_block(self, block: Block):
+        """Registra las transacciones del bloque en el índice por dirección"""
+        for position, tx_dict in enumerate(block.transactions):
+            entry = (block.index, position)
+            self.address_index[tx_dict['sender']].append(entry)
+            if tx_dict['receiver'] != tx_dict['sender']:
+                self.address_index[tx_dict['receiver']].append(entry)
+    
+    def is_chain_valid(self, full: bool = False) -> bool:
+        """Valida la integridad de la blockchain.
+        
+        Solo se comprueban los bloques por encima de `verified_height`, que
+        avanza a medida que se validan; con full=True se revisa desde el génesis
+        y la cabecera de cada bloque se reconstruye en lugar de usar la sellada.
+        """
+        if full:
+            # Los bloques ya validados no cambian, así que se revisan sin el
+            # cerrojo: las validaciones incrementales de las lecturas no esperan
+            # a esta pasada y `verified_height` solo baja si encuentra un error
+            for i in range(1, self.verified_height + 1):
+                if not self.is_block_valid(i, full=True):
+                    with self._verify_lock:
+                        self.verified_height = min(self.verified_height, i - 1)
+                    return False
+        
+        with self._verify_lock:
+            for i in range(self.verified_height + 1, len(self.chain)):
+                if not self.is_block_valid(i, full):
+                    self.verified_height = i - 1
+                    return False
+                self.verified_height = i
             
-            # Verificar Proof of Work
-            if not current_block.hash.startswith('0' * self.difficulty):
-                return False
+            return True
+    
+    def is_block_valid(self, i: int, full: bool = False) -> bool:
+        """Valida un bloque respecto al anterior (con full, sin la cabecera sellada)"""
+        current_block = self.chain[i]
+        previous_block = self.chain[i - 1]
+        
+        # Verificar que las transacciones corresponden a la raíz de Merkle
+        if current_block.merkle_root != current_block.calculate_merkle_root():
+            return False
+        
+        # Verificar hash del bloque actual
+        if current_block.hash != current_block.calculate_hash(full):
+            return False
+        
+        # Verificar hash anterior
+        if current_block.previous_hash != previous_block.hash:
+            return False
+        
+        # Verificar Proof of Work contra el objetivo que exige el reajuste
+        if current_block.target != self.expected_target(i):
+            return False
+        if not current_block.meets_target():
+            return False
         
         return True
     
-    def get_chain_data(self) -> List[Dict]:
-        """Retorna toda la cadena en formato serializable"""
-        return [{
-            'index': block.index,
-            'timestamp': block.timestamp,
-            'hash': block.hash,
-            'previous_hash': block.previous_hash,
-            'nonce': block.nonce,
-            'transactions': block.transactions
-        } for block in self.chain]
+    def verify_chain(self) -> Dict:
+        """Revalida la cadena completa y registra cuánto tardó.
+        
+        Lanza RuntimeError si ya hay otra revalidación completa en curso.
+        """
+        if not self._full_verify_lock.acquire(blocking=False):
+            raise RuntimeError("Ya hay una revalidación de la cadena en curso")
+        try:
+            started = time.perf_counter()
+            valid = self.is_chain_valid(full=True)
+            self.last_full_verification = {
+                'valid': valid,
+                'blocks': len(self.chain),
+                'verified_height': self.verified_height,
+                'seconds': time.perf_counter() - started,
+                'verified_at': time.time()
+            }
+            return self.last_full_verification
+        finally:
+            self._full_verify_lock.release()
+    
+    def get_chain_data(self, start: int = 0, stop: Optional[int] = None) -> List[Dict]:
+        """Retorna la cadena (o el rango de alturas [start, stop)) en formato serializable"""
+        return list(self.iter_chain_data(start, stop))
+    
+    def iter_chain_data(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Dict]:
+        """Genera los bloques del rango [start, stop) uno a uno, sin construir la lista"""
+        length = self._snapshot.length
+        stop = length if stop is None else min(stop, length)
+        for height in range(max(start, 0), stop):
+            yield self.chain[height].to_dict()
+    
+    def iter_encoded_blocks(self, start: int = 0, stop: Optional[int] = None) -> Iterator[bytes]:
+        """Como `iter_chain_data`, pero con la codificación JSON ya hecha de cada bloque"""
+        length = self._snapshot.length
+        stop = length if stop is None else min(stop, length)
+        if isinstance(self.chain, PersistentChain):
+            for height in range(max(start, 0), stop):
+                yield self.chain.encoded(height)
+        else:
+            for height in range(max(start, 0), stop):
+                yield self.chain[height].encode()
+    
+    def get_block(self, height: int) -> Optional[Block]:
+        """Retorna el bloque de la altura dada, si existe"""
+        return self._snapshot.block(height)
+    
+    def get_block_by_hash(self, block_hash: str) -> Optional[Block]:
+        """Retorna el bloque con el hash dado, si existe"""
+        try:
+            digest = bytes.fromhex(block_hash)
+        except ValueError:
+            return None
+        self._indexes_ready.wait()
+        height = self.block_heights.get(digest)
+        return None if height is None else self._snapshot.block(height)
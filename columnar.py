@@ -0,0 +1,88 @@
+import sys
+import threading
+from array import array
+from typing import Dict, Iterator, List, Optional
+
+
+class AddressTable:
+    """Tabla de direcciones internadas: cada dirección se guarda una sola vez y se referencia por número"""
+    
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._addresses: List[str] = []
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._addresses)
+    
+    def id_for(self, address: str) -> int:
+        address_id = self._ids.get(address)
+        if address_id is None:
+            with self._lock:
+                address_id = self._ids.get(address)
+                if address_id is None:
+                    address_id = len(self._addresses)
+                    self._addresses.append(sys.intern(address))
+                    self._ids[self._addresses[-1]] = address_id
+        return address_id
+    
+    def address(self, address_id: int) -> str:
+        return self._addresses[address_id]
+
+
+ADDRESSES = AddressTable()
+
+
+class TransactionColumns:
+    """Transacciones confirmadas de un bloque guardadas por columnas.
+    
+    En lugar de un diccionario por transacción se guardan arrays compactos:
+    remitente y receptor como números de la tabla de direcciones (4 bytes) e
+    importe, comisión y fecha como dobles (8 bytes). Se comporta como una
+    lista de solo lectura que reconstruye el diccionario al acceder, así que
+    la salida JSON no cambia.
+    """
+    
+    __slots__ = ('senders', 'receivers', 'amounts', 'commissions', 'timestamps')
+    
+    FIELDS = ('sender', 'receiver', 'amount', 'commission', 'timestamp')
+    
+    def __init__(self):
+        self.senders = array('I')
+        self.receivers = array('I')
+        self.amounts = array('d')
+        self.commissions = array('d')
+        self.timestamps = array('d')
+    
+    @classmethod
+    def from_dicts(cls, transactions: List[Dict]) -> Optional['TransactionColumns']:
+        """Convierte una lista de transacciones; retorna None si alguna no se puede
+        representar exactamente (campos distintos o importes que no son float)"""
+        columns = cls()
+        for tx in transactions:
+            if tx.keys() != set(cls.FIELDS):
+                return None
+            if not all(type(tx[field]) is float for field in ('amount', 'commission', 'timestamp')):
+                return None
+            columns.senders.append(ADDRESSES.id_for(tx['sender']))
+            columns.receivers.append(ADDRESSES.id_for(tx['receiver']))
+            columns.amounts.append(tx['amount'])
+            columns.commissions.append(tx['commission'])
+            columns.timestamps.append(tx['timestamp'])
+        return columns
+    
+    def __len__(self) -> int:
+        return len(self.amounts)
+    
+    def __getitem__(self, position: int) -> Dict:
+        return {
+            'sender': ADDRESSES.address(self.senders[position]),
+            'receiver': ADDRESSES.address(self.receivers[position]),
+            'amount': self.amounts[position],
+            'commission': self.commissions[position],
+            'timestamp': self.timestamps[position]
+        }
+    
+    def __iter__(self) -> Iterator[Dict]:
+        for position in range(len(self.amounts)):
+            yield self[position]
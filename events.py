@@ -0,0 +1,59 @@
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+
+Event = Tuple[int, str, Dict]
+
+
+class EventBus:
+    """Difunde eventos de la cadena a los clientes suscritos.
+
+    Los eventos se guardan numerados en un búfer circular de `history`
+    entradas; cada lector recuerda el último identificador que vio y pide los
+    posteriores, así que publicar cuesta lo mismo con uno o con mil clientes
+    y un cliente que se reconecta puede continuar donde lo dejó. Si se quedó
+    tan atrás que sus eventos ya salieron del búfer recibe un único evento
+    'resync' para que recargue el estado completo.
+    """
+
+    def __init__(self, history: int = 256):
+        self._events: deque = deque(maxlen=history)
+        self._last_id = 0
+        self._condition = threading.Condition()
+
+    @property
+    def last_id(self) -> int:
+        """Identificador del último evento publicado"""
+        return self._last_id
+
+    def publish(self, event: str, data: Dict, event_id: Optional[int] = None):
+        """Publica un evento y despierta a los lectores que esperan.
+        
+        `event_id` conserva el identificador original al republicar los
+        eventos de otro proceso, de modo que un cliente puede reconectarse a
+        cualquier réplica. Si no es mayor que el último, el origen se
+        reinició y se descartan los anteriores.
+        """
+        with self._condition:
+            if event_id is None:
+                event_id = self._last_id + 1
+            elif event_id <= self._last_id:
+                self._events.clear()
+            self._last_id = event_id
+            self._events.append((self._last_id, event, data))
+            self._condition.notify_all()
+
+    def wait(self, after: int, timeout: Optional[float] = None) -> List[Event]:
+        """Retorna los eventos posteriores a `after`, esperando hasta `timeout` si no hay ninguno"""
+        with self._condition:
+            if after > self._last_id:
+                # Identificador de otra ejecución del servidor
+                return [(self._last_id, 'resync', {})]
+            if self._last_id == after:
+                self._condition.wait(timeout)
+                if self._last_id == after:
+                    return []
+            if not self._events or after < self._events[0][0] - 1:
+                return [(self._last_id, 'resync', {})]
+            return [event for event in self._events if event[0] > after]
@@ -0,0 +1,160 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from blockchain import Block, Blockchain
+from mining import MiningResult
+
+
+class MiningJob:
+    """Trabajo de minería que se ejecuta en segundo plano"""
+    
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    CANCELLED = 'cancelled'
+    FAILED = 'failed'
+    
+    def __init__(self, miner_address: str):
+        self.id = uuid.uuid4().hex
+        self.miner_address = miner_address
+        self.status = self.PENDING
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.attempts = 0
+        self.block: Optional[Block] = None
+        self.mining_result: Optional[MiningResult] = None  # Última búsqueda de nonce
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in (self.COMPLETED, self.CANCELLED, self.FAILED)
+    
+    @property
+    def elapsed(self) -> float:
+        """Segundos de minería transcurridos"""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+    
+    @property
+    def hashrate(self) -> float:
+        elapsed = self.elapsed
+        return self.attempts / elapsed if elapsed > 0 else 0.0
+    
+    def to_dict(self) -> Dict:
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'miner_address': self.miner_address,
+            'attempts': self.attempts,
+            'elapsed': self.elapsed,
+            'hashrate': self.hashrate,
+            'created_at': self.created_at
+        }
+        if self.mining_result is not None:
+            data['workers'] = self.mining_result.worker_stats
+        if self.block is not None:
+            data['block'] = {
+                'index': self.block.index,
+                'hash': self.block.hash,
+                'nonce': self.block.nonce,
+                'merkle_root': self.block.merkle_root,
+                'transactions': self.block.to_dict()['transactions']
+            }
+        if self.error:
+            data['error'] = self.error
+        return data
+
+
+class MiningJobManager:
+    """Lanza y sigue trabajos de minería sin bloquear las peticiones HTTP.
+    
+    Cada trabajo mina en su propio hilo; el bloque solo se añade a la cadena
+    cuando el trabajo termina. Se permite un trabajo activo por minero.
+    """
+    
+    def __init__(self, blockchain: Blockchain, max_active_jobs: int = 8,
+                 max_finished_jobs: int = 1000):
+        self.blockchain = blockchain
+        self.max_active_jobs = max_active_jobs
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs: "OrderedDict[str, MiningJob]" = OrderedDict()
+        self._active_by_miner: Dict[str, MiningJob] = {}
+        self._lock = threading.Lock()
+    
+    def submit(self, miner_address: str) -> MiningJob:
+        """Crea y arranca un trabajo de minería.
+        
+        Si el minero ya tiene un trabajo activo se retorna ese mismo trabajo.
+        Lanza RuntimeError si se alcanzó el máximo de trabajos simultáneos.
+        """
+        with self._lock:
+            active = self._active_by_miner.get(miner_address)
+            if active is not None:
+                return active
+            if len(self._active_by_miner) >= self.max_active_jobs:
+                raise RuntimeError("Demasiados trabajos de minería en curso")
+            
+            job = MiningJob(miner_address)
+            self.jobs[job.id] = job
+            self._active_by_miner[miner_address] = job
+            self._evict_finished()
+        
+        thread = threading.Thread(target=self._run, args=(job,), daemon=True,
+                                  name=f"mining-{job.id[:8]}")
+        thread.start()
+        return job
+    
+    def get(self, job_id: str) -> Optional[MiningJob]:
+        return self.jobs.get(job_id)
+    
+    def active_count(self) -> int:
+        """Número de trabajos pendientes o en curso"""
+        return len(self._active_by_miner)
+    
+    def cancel(self, job_id: str) -> bool:
+        """Solicita la cancelación de un trabajo; retorna False si ya terminó"""
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel_event.set()
+        return True
+    
+    def _run(self, job: MiningJob):
+        job.status = MiningJob.RUNNING
+        job.started_at = time.time()
+        
+        def report(attempts: int):
+            job.attempts = attempts
+        
+        def keep_result(result: MiningResult):
+            job.mining_result = result
+        
+        # Sin cProfile: la prueba de trabajo ocuparía el perfil durante todo el
+        # bloque; su coste ya lo miden las fases ('pow', 'select', ...)
+        try:
+            block = self.blockchain.mine_pending_transactions(
+                job.miner_address, job.cancel_event, report, keep_result)
+            if block is None:
+                job.status = MiningJob.CANCELLED
+            else:
+                job.block = block
+                job.status = MiningJob.COMPLETED
+        except Exception as e:
+            job.error = str(e)
+            job.status = MiningJob.FAILED
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._active_by_miner.pop(job.miner_address, None)
+    
+    def _evict_finished(self):
+        """Descarta los trabajos terminados más antiguos por encima del límite"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
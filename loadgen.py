@@ -0,0 +1,279 @@
+"""Generador de carga multiusuario para la API.
+
+Simula carteras que hacen lo mismo que el panel de HTML_TEMPLATE: se
+registran, inician sesión, consultan saldo, punta de la cadena, estadísticas
+e historial, envían transferencias y minan (sondeando el trabajo como el
+panel). Las peticiones llegan en bucle abierto: siguen un proceso de Poisson
+a la tasa pedida sin esperar a que terminen las anteriores, y la latencia se
+mide desde el instante en que la petición debía salir, de modo que las colas
+del servidor se reflejan en los percentiles.
+
+    # En proceso, con el cliente de pruebas de Flask
+    python loadgen.py --users 1000 --rate 200 --duration 30
+
+    # Contra un servidor local
+    python loadgen.py --url http://localhost:5000 --users 200 --rate 50
+
+El resultado (JSON) trae, por endpoint, peticiones, códigos de estado,
+rendimiento y latencias p50/p95/p99.
+"""
+import argparse
+import contextlib
+import http.cookiejar
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from benchmark import latency_stats
+
+
+# Peso de cada acción en la mezcla por defecto, parecida al uso del panel
+DEFAULT_MIX = 'balance=35,head=20,history=15,stats=5,transfer=15,mine=10'
+
+
+class InProcessClient:
+    """Sesión de un usuario sobre el cliente de pruebas de Flask"""
+
+    def __init__(self, app):
+        self._client = app.test_client()
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, Dict]:
+        response = self._client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True) or {}
+
+
+class HttpClient:
+    """Sesión de un usuario contra un servidor, con sus propias cookies"""
+
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self._opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, Dict]:
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with self._opener.open(request, timeout=self.timeout) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        try:
+            return status, json.loads(payload) if payload else {}
+        except ValueError:
+            return status, {}
+
+
+class VirtualUser:
+    """Cartera simulada; sus peticiones se hacen de una en una, como en un navegador"""
+
+    def __init__(self, index: int, client):
+        self.email = 'load-%d@loadgen.test' % index
+        self.password = 'loadgen-%d' % index
+        self.client = client
+        self.wallet: Optional[str] = None
+        self.job_id: Optional[str] = None
+        self.lock = threading.Lock()
+
+
+class LoadGenerator:
+    def __init__(self, users: List[VirtualUser], mix: Dict[str, float], seed: int):
+        self.users = users
+        self.actions = list(mix)
+        self.weights = [mix[action] for action in self.actions]
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = {}
+        self._statuses: Dict[str, Dict[str, int]] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint: str, scheduled: float, status: Optional[int]):
+        latency = time.perf_counter() - scheduled
+        with self._lock:
+            self._samples.setdefault(endpoint, []).append(latency)
+            statuses = self._statuses.setdefault(endpoint, {})
+            key = str(status) if status is not None else 'exception'
+            statuses[key] = statuses.get(key, 0) + 1
+            if status is None or status >= 500:
+                self._errors[endpoint] = self._errors.get(endpoint, 0) + 1
+
+    def call(self, user: VirtualUser, endpoint: str, method: str, path: str,
+             body: Optional[Dict] = None, scheduled: Optional[float] = None) -> Tuple[Optional[int], Dict]:
+        scheduled = time.perf_counter() if scheduled is None else scheduled
+        try:
+            status, data = user.client.request(method, path, body)
+        except Exception:
+            status, data = None, {}
+        self.record(endpoint, scheduled, status)
+        return status, data
+
+    def sign_up(self, user: VirtualUser):
+        """Registro e inicio de sesión, como al abrir el panel por primera vez"""
+        credentials = {'email': user.email, 'password': user.password}
+        self.call(user, 'POST /api/register', 'POST', '/api/register', credentials)
+        status, data = self.call(user, 'POST /api/login', 'POST', '/api/login', credentials)
+        if status == 200:
+            user.wallet = data['wallet_address']
+
+    def act(self, user: VirtualUser, action: str, scheduled: float):
+        with user.lock:
+            if user.wallet is None:
+                return
+            if action == 'balance':
+                self.call(user, 'GET /api/balance/<wallet>', 'GET',
+                          '/api/balance/%s' % user.wallet, scheduled=scheduled)
+            elif action == 'head':
+                self.call(user, 'GET /api/chain/head', 'GET', '/api/chain/head', scheduled=scheduled)
+            elif action == 'chain':
+                self.call(user, 'GET /api/chain', 'GET', '/api/chain?limit=100', scheduled=scheduled)
+            elif action == 'history':
+                self.call(user, 'GET /api/history/<wallet>', 'GET',
+                          '/api/history/%s?limit=50' % user.wallet, scheduled=scheduled)
+            elif action == 'stats':
+                self.call(user, 'GET /api/stats', 'GET', '/api/stats', scheduled=scheduled)
+            elif action == 'transfer':
+                receiver = self.pick_user()
+                if receiver.wallet is None or receiver is user:
+                    return
+                self.call(user, 'POST /api/transaction', 'POST', '/api/transaction',
+                          {'receiver': receiver.wallet, 'amount': 0.5}, scheduled=scheduled)
+            elif action == 'mine':
+                # Con un trabajo en curso el panel sondea su estado en lugar de minar otra vez
+                if user.job_id is not None:
+                    status, data = self.call(user, 'GET /api/mine/<job_id>', 'GET',
+                                             '/api/mine/%s' % user.job_id, scheduled=scheduled)
+                    if status != 200 or data.get('status') not in ('pending', 'running'):
+                        user.job_id = None
+                else:
+                    status, data = self.call(user, 'POST /api/mine', 'POST', '/api/mine',
+                                             scheduled=scheduled)
+                    if status == 202:
+                        user.job_id = data['job_id']
+
+    def pick_user(self) -> VirtualUser:
+        with self._rng_lock:
+            return self.rng.choice(self.users)
+
+    def run(self, rate: float, duration: float, concurrency: int) -> float:
+        """Lanza acciones con llegadas de Poisson a `rate` por segundo durante `duration`"""
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            started = time.perf_counter()
+            scheduled = started
+            while True:
+                with self._rng_lock:
+                    scheduled += self.rng.expovariate(rate)
+                    user = self.rng.choice(self.users)
+                    action = self.rng.choices(self.actions, self.weights)[0]
+                if scheduled - started >= duration:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.act, user, action, scheduled)
+        return time.perf_counter() - started
+
+    def report(self, elapsed: float) -> Dict:
+        endpoints = {}
+        for endpoint, samples in sorted(self._samples.items()):
+            endpoints[endpoint] = dict(latency_stats(samples),
+                                       throughput=len(samples) / elapsed,
+                                       statuses=self._statuses[endpoint],
+                                       errors=self._errors.get(endpoint, 0))
+        total = sum(len(samples) for samples in self._samples.values())
+        return {'seconds': elapsed, 'requests': total,
+                'throughput': total / elapsed if elapsed else 0.0, 'endpoints': endpoints}
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._statuses.clear()
+            self._errors.clear()
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(','):
+        action, _, weight = part.partition('=')
+        mix[action.strip()] = float(weight)
+    unknown = set(mix) - {'balance', 'head', 'chain', 'history', 'stats', 'transfer', 'mine'}
+    if unknown:
+        raise ValueError("Acciones desconocidas: %s" % ', '.join(sorted(unknown)))
+    return mix
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', help='servidor contra el que lanzar la carga (por defecto, en proceso)')
+    parser.add_argument('--users', type=int, default=100, help='carteras simuladas')
+    parser.add_argument('--rate', type=float, default=50.0, help='acciones por segundo')
+    parser.add_argument('--duration', type=float, default=30.0, help='segundos de carga')
+    parser.add_argument('--concurrency', type=int, default=32, help='peticiones simultáneas como máximo')
+    parser.add_argument('--signup-rate', type=float, default=0.0,
+                        help='registros por segundo durante la preparación (0: sin límite)')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='pesos de las acciones, p. ej. %s' % DEFAULT_MIX)
+    parser.add_argument('--timeout', type=float, default=30.0, help='tiempo máximo por petición con --url')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='archivo JSON de resultados (por defecto, la salida estándar)')
+    args = parser.parse_args(argv)
+    output_path = args.output and os.path.abspath(args.output)
+
+    if args.url:
+        def make_client():
+            return HttpClient(args.url, args.timeout)
+    else:
+        # app.py crea la cadena y la base de cuentas en el directorio actual
+        os.chdir(tempfile.mkdtemp(prefix='blockchain-load-'))
+        import app as server
+
+        def make_client():
+            return InProcessClient(server.app)
+
+    users = [VirtualUser(index, make_client()) for index in range(args.users)]
+    generator = LoadGenerator(users, parse_mix(args.mix), args.seed)
+
+    # En proceso, los mensajes del servidor van a stderr para no mezclarse con el JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for index, user in enumerate(users):
+                if args.signup_rate > 0:
+                    delay = started + index / args.signup_rate - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                pool.submit(generator.sign_up, user)
+        signup = generator.report(time.perf_counter() - started)
+        generator.reset()
+
+        elapsed = generator.run(args.rate, args.duration, args.concurrency)
+    report = {
+        'meta': {
+            'timestamp': time.time(),
+            'target': args.url or 'in-process',
+            'arguments': {key: value for key, value in vars(args).items() if key != 'output'}
+        },
+        'signup': signup,
+        'load': generator.report(elapsed)
+    }
+
+    output = json.dumps(report, indent=2)
+    if output_path:
+        with open(output_path, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
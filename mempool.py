@@ -0,0 +1,143 @@
+import bisect
+import json
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from blockchain import Transaction
+
+
+class Mempool:
+    """Transacciones pendientes ordenadas por comisión.
+    
+    Mantiene una lista ordenada de claves (comisión, -llegada) para que la
+    mejor transacción esté siempre al final y la peor al principio. Cuando se
+    alcanza `max_size` se descarta la de menor comisión. También lleva la
+    cuenta de lo que cada remitente tiene comprometido (importe + comisión)
+    en transacciones pendientes, actualizada al entrar y salir cada una. No
+    es seguro entre hilos por sí mismo: `Blockchain` lo protege con su cerrojo.
+    """
+    
+    def __init__(self, max_size: int = 50000):
+        self.max_size = max_size
+        self.version = 0  # Aumenta con cada cambio del conjunto pendiente
+        self._entries: Dict[int, Tuple[Tuple[float, int], 'Transaction', int]] = {}
+        self._order: List[Tuple[float, int, int]] = []
+        self._sequence = 0
+        self._reserved: Dict[str, float] = {}  # Salida pendiente por remitente
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def __iter__(self) -> Iterator['Transaction']:
+        """Recorre las transacciones de mayor a menor comisión"""
+        for _, _, key in reversed(self._order):
+            yield self._entries[key][1]
+    
+    def __contains__(self, transaction: 'Transaction') -> bool:
+        return id(transaction) in self._entries
+    
+    def add(self, transaction: 'Transaction') -> Tuple[bool, List['Transaction']]:
+        """Añade una transacción; retorna si se aceptó y las que se descartaron para hacerle sitio"""
+        key = id(transaction)
+        if key in self._entries:
+            return False, []
+        
+        evicted = []
+        if len(self._entries) >= self.max_size:
+            lowest = self._order[0]
+            if transaction.commission <= lowest[0]:
+                return False, []
+            evicted.append(self._discard(lowest[2]))
+        
+        self._sequence += 1
+        sort_key = (transaction.commission, -self._sequence, key)
+        size = len(json.dumps(transaction.to_dict()))
+        self._entries[key] = (sort_key, transaction, size)
+        bisect.insort(self._order, sort_key)
+        self._reserve(transaction, 1)
+        self.version += 1
+        return True, evicted
+    
+    def remove(self, transactions: List['Transaction']) -> List['Transaction']:
+        """Quita las transacciones dadas (p. ej. las incluidas en un bloque)"""
+        return [self._discard(id(tx)) for tx in transactions if id(tx) in self._entries]
+    
+    def _discard(self, key: int) -> 'Transaction':
+        sort_key, transaction, _ = self._entries.pop(key)
+        position = bisect.bisect_left(self._order, sort_key)
+        del self._order[position]
+        self._reserve(transaction, -1)
+        self.version += 1
+        return transaction
+    
+    def _reserve(self, transaction: 'Transaction', sign: int):
+        if transaction.sender == 'SISTEMA':
+            return
+        total = self._reserved.get(transaction.sender, 0.0)
+        total += sign * (transaction.amount + transaction.commission)
+        if total > 1e-9:
+            self._reserved[transaction.sender] = total
+        else:
+            self._reserved.pop(transaction.sender, None)
+    
+    def reserved(self, address: str) -> float:
+        """Importe + comisión que la dirección tiene comprometido en transacciones pendientes"""
+        return self._reserved.get(address, 0.0)
+    
+    def reservations(self) -> Dict[str, float]:
+        """Copia de lo comprometido por cada remitente"""
+        return dict(self._reserved)
+    
+    def select(self, max_count: int, max_bytes: Optional[int] = None) -> List['Transaction']:
+        """Plantilla de bloque: las mejores transacciones hasta el límite de cantidad o tamaño"""
+        selected = []
+        total_bytes = 0
+        for _, _, key in reversed(self._order):
+            if len(selected) >= max_count:
+                break
+            _, transaction, size = self._entries[key]
+            if max_bytes is not None and total_bytes + size > max_bytes:
+                break
+            selected.append(transaction)
+            total_bytes += size
+        return selected
+    
+    def top(self, limit: int) -> List['Transaction']:
+        """Las `limit` transacciones de mayor comisión"""
+        return self.select(limit)
+
+
+class MempoolMirror:
+    """Copia de las reservas y el tamaño del mempool de otro proceso.
+    
+    La usa una cadena abierta en solo lectura: las transacciones pendientes
+    viven en el proceso escritor y aquí solo se guarda lo necesario para
+    calcular saldos disponibles y estadísticas. `reset` carga el estado
+    completo y `update` aplica los cambios que anuncia cada evento.
+    """
+    
+    def __init__(self):
+        self.version = 0
+        self._count = 0
+        self._reserved: Dict[str, float] = {}
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def reserved(self, address: str) -> float:
+        return self._reserved.get(address, 0.0)
+    
+    def reset(self, pending: int, reserved: Dict[str, float]):
+        self._count = pending
+        self._reserved = {address: amount for address, amount in reserved.items() if amount > 1e-9}
+        self.version += 1
+    
+    def update(self, pending: int, reserved: Dict[str, float]):
+        """Fija el tamaño y las reservas de las direcciones dadas; el resto no cambia"""
+        self._count = pending
+        for address, amount in reserved.items():
+            if amount > 1e-9:
+                self._reserved[address] = amount
+            else:
+                self._reserved.pop(address, None)
+        self.version += 1
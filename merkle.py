@@ -0,0 +1,69 @@
+import hashlib
+import json
+from typing import Dict, List
+
+# Prefijos distintos para hojas y nodos internos, de modo que un nodo
+# interno nunca pueda hacerse pasar por una transacción
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+EMPTY_ROOT = bytes(32)  # Raíz de un bloque sin transacciones
+
+
+def hash_transaction(tx: Dict) -> bytes:
+    """Hash de hoja de una transacción serializada de forma canónica"""
+    return hashlib.sha256(LEAF_PREFIX + json.dumps(tx, sort_keys=True).encode()).digest()
+
+
+def _hash_pair(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def _next_level(level: List[bytes]) -> List[bytes]:
+    """Combina los nodos de dos en dos; un nodo impar sube sin cambios"""
+    parents = [_hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+    if len(level) % 2:
+        parents.append(level[-1])
+    return parents
+
+
+def merkle_root(leaves: List[bytes]) -> bytes:
+    """Calcula la raíz de Merkle de una lista de hashes de hoja"""
+    if not leaves:
+        return EMPTY_ROOT
+    level = leaves
+    while len(level) > 1:
+        level = _next_level(level)
+    return level[0]
+
+
+def merkle_proof(leaves: List[bytes], position: int) -> List[Dict]:
+    """Construye la prueba de inclusión de la hoja en `position`.
+    
+    Cada paso indica el hash hermano y si va a la izquierda o a la derecha
+    del hash acumulado.
+    """
+    proof = []
+    level = leaves
+    while len(level) > 1:
+        sibling = position ^ 1
+        if sibling < len(level):
+            proof.append({
+                'hash': level[sibling].hex(),
+                'position': 'left' if sibling < position else 'right'
+            })
+        level = _next_level(level)
+        position //= 2
+    return proof
+
+
+def verify_merkle_proof(leaf: bytes, proof: List[Dict], root: bytes) -> bool:
+    """Comprueba que una hoja pertenece al árbol con la raíz dada"""
+    current = leaf
+    for step in proof:
+        sibling = bytes.fromhex(step['hash'])
+        if step['position'] == 'left':
+            current = _hash_pair(sibling, current)
+        else:
+            current = _hash_pair(current, sibling)
+    return current == root
@@ -0,0 +1,263 @@
+import hashlib
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+MAX_TARGET = (1 << 256) - 1  # Objetivo más fácil: cualquier hash es válido
+
+
+def difficulty_to_target(difficulty: float) -> int:
+    """Convierte una dificultad (ceros hexadecimales iniciales) en un objetivo numérico.
+    
+    Un hash es válido si, leído como entero de 256 bits, no supera el objetivo.
+    """
+    difficulty = min(max(difficulty, 0), 64)
+    return max(int(2 ** (256 - 4 * difficulty)) - 1, 0)
+
+
+def target_to_difficulty(target: int) -> float:
+    """Dificultad equivalente en ceros hexadecimales para un objetivo numérico"""
+    return (256 - math.log2(target + 1)) / 4
+
+
+def search_nonce(header: bytes, target: int, start: int = 0,
+                 stop: Optional[int] = None) -> Tuple[Optional[int], Optional[bytes], int]:
+    """Busca un nonce en [start, stop) cuyo hash no supere el objetivo.
+    
+    La cabecera (todo el bloque excepto el nonce) se procesa una sola vez y el
+    estado intermedio de SHA-256 se copia en cada intento, de modo que solo se
+    hashean los bytes del nonce. Retorna (nonce, digest, intentos); nonce y
+    digest son None si el rango se agota sin encontrar solución.
+    """
+    midstate = hashlib.sha256(header)
+    copy = midstate.copy
+    from_bytes = int.from_bytes
+    
+    nonce = start
+    while stop is None or nonce < stop:
+        h = copy()
+        h.update(b'%d' % nonce)
+        digest = h.digest()
+        if from_bytes(digest, 'big') <= target:
+            return nonce, digest, nonce - start + 1
+        nonce += 1
+    
+    return None, None, nonce - start
+
+
+class MiningResult:
+    """Resultado de una búsqueda de nonce"""
+    
+    def __init__(self, nonce: Optional[int], digest: Optional[bytes], attempts: int,
+                 elapsed: float, worker_stats: Optional[List[Dict]] = None):
+        self.nonce = nonce
+        self.digest = digest
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.worker_stats = worker_stats or []
+    
+    @property
+    def found(self) -> bool:
+        """Indica si la búsqueda terminó con un nonce válido"""
+        return self.nonce is not None
+    
+    @property
+    def hashrate(self) -> float:
+        """Hashes por segundo del conjunto de trabajadores"""
+        return self.attempts / self.elapsed if self.elapsed > 0 else 0.0
+    
+    def to_dict(self) -> Dict:
+        return {
+            'nonce': self.nonce,
+            'attempts': self.attempts,
+            'elapsed': self.elapsed,
+            'hashrate': self.hashrate,
+            'workers': self.worker_stats
+        }
+
+
+_stop_event = None
+_progress = None
+
+
+def _init_worker(stop_event, progress):
+    """Inicializa un proceso trabajador con el aviso de parada y el contador de progreso"""
+    global _stop_event, _progress
+    _stop_event = stop_event
+    _progress = progress
+
+
+def _search_partition(header: bytes, target: int, start: int, worker_id: int,
+                      workers: int, chunk_size: int) -> Tuple[int, Optional[int], Optional[bytes], int, float]:
+    """Recorre los tramos del espacio de nonces asignados a un trabajador.
+    
+    El trabajador i prueba los tramos i, i + workers, i + 2 * workers, ... de
+    tamaño chunk_size, y entre tramo y tramo comprueba si otro trabajador ya
+    encontró solución (o si se canceló la búsqueda) para detenerse cuanto antes.
+    """
+    started = time.perf_counter()
+    attempts = 0
+    base = start + worker_id * chunk_size
+    stride = workers * chunk_size
+    
+    while not _stop_event.is_set():
+        nonce, digest, tried = search_nonce(header, target, base, base + chunk_size)
+        attempts += tried
+        _progress[worker_id] = attempts
+        if nonce is not None:
+            _stop_event.set()
+            return worker_id, nonce, digest, attempts, time.perf_counter() - started
+        base += stride
+    
+    return worker_id, None, None, attempts, time.perf_counter() - started
+
+
+class Miner:
+    """Ejecuta la búsqueda de nonce en uno o varios procesos.
+    
+    Con varios trabajadores el grupo de procesos se crea en la primera
+    búsqueda y se reutiliza en las siguientes, de modo que arrancar procesos
+    no cuesta más que el propio bloque a dificultades bajas. Las búsquedas
+    sobre el grupo se hacen de una en una: comparten el aviso de parada y los
+    contadores de progreso, y usan los mismos núcleos.
+    """
+    
+    def __init__(self, workers: int = 1, chunk_size: int = 50000):
+        if workers < 1:
+            raise ValueError("Se necesita al menos un trabajador de minería")
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._stop_event = None
+        self._counters = None
+        self._search_lock = threading.Lock()
+    
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._stop_event = multiprocessing.Event()
+            self._counters = multiprocessing.Array('Q', self.workers, lock=False)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(self._stop_event, self._counters))
+        return self._pool
+    
+    def close(self):
+        """Detiene los procesos trabajadores, si los hay"""
+        if self._stop_event is not None:
+            self._stop_event.set()  # Interrumpe la búsqueda en curso
+        with self._search_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True, cancel_futures=True)
+                self._pool = None
+    
+    def mine(self, header: bytes, target: int, start: int = 0,
+             cancel: Optional[threading.Event] = None,
+             progress: Optional[Callable[[int], None]] = None) -> MiningResult:
+        """Busca un nonce válido para la cabecera dada.
+        
+        Si se activa `cancel` la búsqueda se detiene y el resultado no trae
+        nonce. `progress` recibe periódicamente los intentos acumulados.
+        """
+        if self.workers == 1:
+            return self._mine_serial(header, target, start, cancel, progress)
+        return self._mine_parallel(header, target, start, cancel, progress)
+    
+    def _mine_serial(self, header: bytes, target: int, start: int,
+                     cancel: Optional[threading.Event],
+                     progress: Optional[Callable[[int], None]]) -> MiningResult:
+        started = time.perf_counter()
+        attempts = 0
+        nonce = digest = None
+        base = start
+        
+        while cancel is None or not cancel.is_set():
+            nonce, digest, tried = search_nonce(header, target, base, base + self.chunk_size)
+            attempts += tried
+            if progress:
+                progress(attempts)
+            if nonce is not None:
+                break
+            base += self.chunk_size
+        
+        elapsed = time.perf_counter() - started
+        stats = [_worker_stats(0, attempts, elapsed)]
+        return MiningResult(nonce, digest, attempts, elapsed, stats)
+    
+    def _mine_parallel(self, header: bytes, target: int, start: int,
+                       cancel: Optional[threading.Event],
+                       progress: Optional[Callable[[int], None]]) -> MiningResult:
+        started = time.perf_counter()
+        # Esperar a que termine la búsqueda en curso sin dejar de atender la cancelación
+        while not self._search_lock.acquire(timeout=0.25):
+            if cancel is not None and cancel.is_set():
+                return MiningResult(None, None, 0, time.perf_counter() - started)
+        try:
+            winner, stats = self._search(header, target, start, cancel, progress)
+        finally:
+            self._search_lock.release()
+        
+        elapsed = time.perf_counter() - started
+        stats.sort(key=lambda s: s['worker'])
+        total_attempts = sum(s['attempts'] for s in stats)
+        return MiningResult(winner[0], winner[1], total_attempts, elapsed, stats)
+    
+    def _search(self, header: bytes, target: int, start: int,
+                cancel: Optional[threading.Event],
+                progress: Optional[Callable[[int], None]]) -> Tuple[Tuple, List[Dict]]:
+        """Reparte la búsqueda entre los trabajadores del grupo (con _search_lock tomado)"""
+        if cancel is not None and cancel.is_set():
+            # Como en la búsqueda en serie, cancelar antes de empezar no prueba ningún nonce
+            return (None, None), []
+        pool = self._get_pool()
+        stop_event, counters = self._stop_event, self._counters
+        stop_event.clear()
+        for worker_id in range(self.workers):
+            counters[worker_id] = 0
+        winner = (None, None)
+        stats = []
+        
+        pending = {
+            pool.submit(_search_partition, header, target, start,
+                        worker_id, self.workers, self.chunk_size)
+            for worker_id in range(self.workers)
+        }
+        try:
+            # Al primer nonce encontrado (o al cancelar) el resto de trabajadores
+            # termina su tramo actual y retorna, así que basta con esperar a todos
+            while pending:
+                # Antes de cada espera: una cancelación llega a los trabajadores
+                # desde su primer tramo, no tras la primera espera
+                if cancel is not None and cancel.is_set():
+                    stop_event.set()
+                done, pending = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+                for future in done:
+                    worker_id, nonce, digest, attempts, elapsed = future.result()
+                    stats.append(_worker_stats(worker_id, attempts, elapsed))
+                    if nonce is not None and winner[0] is None:
+                        winner = (nonce, digest)
+                if progress:
+                    progress(sum(counters))
+        except BrokenProcessPool:
+            # Un trabajador murió: el grupo no se puede reutilizar
+            self._pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            # Si un trabajador falla, el resto no debe seguir buscando ni ocupar
+            # el grupo para la próxima búsqueda
+            stop_event.set()
+            wait(pending)
+        return winner, stats
+
+
+def _worker_stats(worker_id: int, attempts: int, elapsed: float) -> Dict:
+    return {
+        'worker': worker_id,
+        'attempts': attempts,
+        'elapsed': elapsed,
+        'hashrate': attempts / elapsed if elapsed > 0 else 0.0
+    }
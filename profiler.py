@@ -0,0 +1,220 @@
+import collections
+import contextlib
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+
+_NO_PHASE = contextlib.nullcontext()
+
+# Hojas de pila de hilos que solo esperan trabajo (servidor, colas, eventos)
+IDLE_FRAMES = frozenset({'threading.py:wait', 'selectors.py:select', 'socket.py:accept',
+                         'socket.py:readinto', 'queue.py:get', 'events.py:wait'})
+
+
+class _Phase:
+    __slots__ = ('session', 'name', 'started')
+
+    def __init__(self, session: 'ProfilingSession', name: str):
+        self.session = session
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.session.record_phase(self.name, time.perf_counter() - self.started)
+
+
+class ProfilingSession:
+    """Datos recogidos durante una ventana de perfilado.
+
+    Termina al pasar `seconds` o al completarse `requests` peticiones, lo que
+    ocurra antes.
+    """
+
+    def __init__(self, mode: str, seconds: float, requests: Optional[int], interval: float):
+        self.mode = mode
+        self.seconds = seconds
+        self.requests = requests
+        self.interval = interval
+        self.started_at = time.time()
+        self.completed_requests = 0
+        self.done = threading.Event()
+        self._lock = threading.Lock()
+        self.phases: Dict[str, List[float]] = {}  # nombre -> [veces, segundos]
+        self.stacks: collections.Counter = collections.Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self.profile: Optional[cProfile.Profile] = None
+        self.profile_busy = threading.Lock()  # cProfile: un perfil activo a la vez
+        self.skipped = 0  # Peticiones sin perfilar por estar ocupado
+
+    def record_phase(self, name: str, elapsed: float):
+        with self._lock:
+            entry = self.phases.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def request_finished(self):
+        with self._lock:
+            self.completed_requests += 1
+            if self.requests is not None and self.completed_requests >= self.requests:
+                self.done.set()
+
+    def report(self, top: int = 30) -> Dict:
+        elapsed = min(time.time() - self.started_at, self.seconds)
+        phase_total = sum(total for _, total in self.phases.values()) or 1.0
+        report = {
+            'mode': self.mode,
+            'seconds': elapsed,
+            'requests': self.completed_requests,
+            'phases': {
+                name: {
+                    'count': count,
+                    'total_ms': total * 1000,
+                    'mean_ms': total * 1000 / count,
+                    'share': total / phase_total
+                }
+                for name, (count, total) in sorted(self.phases.items(), key=lambda p: -p[1][1])
+            }
+        }
+
+        if self.mode == 'sample':
+            own = collections.Counter()
+            for stack, count in self.stacks.items():
+                own[stack.rsplit(';', 1)[-1]] += count
+            report['samples'] = {
+                'total': self.samples,
+                'idle': self.idle_samples,
+                'interval_ms': self.interval * 1000,
+                'top_stacks': [{'stack': stack, 'count': count}
+                               for stack, count in self.stacks.most_common(top)],
+                'top_functions': [{'function': function, 'count': count}
+                                  for function, count in own.most_common(top)]
+            }
+        else:
+            text = ''
+            if self.profile is not None:
+                out = io.StringIO()
+                stats = pstats.Stats(self.profile, stream=out)
+                stats.sort_stats('cumulative').print_stats(top)
+                text = out.getvalue()
+            report['cprofile'] = {'report': text, 'skipped': self.skipped}
+        return report
+
+
+class Profiler:
+    """Perfilador que se activa bajo demanda en un servidor en marcha.
+
+    Sin sesión activa, `phase` retorna un contexto vacío compartido y
+    `begin` retorna None, así que la instrumentación no cuesta más que
+    comprobar un atributo.
+
+    Modos:
+    - 'sample': un hilo toma muestras de la pila de todos los hilos cada
+      `interval` segundos y las agrega en pilas colapsadas (formato de
+      flamegraph).
+    - 'cprofile': las peticiones se ejecutan bajo cProfile (una a la vez) y
+      se retorna el informe de pstats. Los trabajos de minería y los flujos
+      de eventos no, porque ocuparían el perfil durante minutos.
+
+    En ambos modos se acumula el tiempo de cada fase marcada con `phase`.
+    """
+
+    MODES = ('sample', 'cprofile')
+
+    def __init__(self):
+        self._session: Optional[ProfilingSession] = None
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self._session is not None
+
+    def phase(self, name: str):
+        """Contexto que mide una fase si hay una sesión de perfilado en curso"""
+        session = self._session
+        if session is None:
+            return _NO_PHASE
+        return _Phase(session, name)
+
+    def begin(self) -> Optional[ProfilingSession]:
+        """Activa cProfile en el hilo actual si hay una sesión 'cprofile' libre.
+        
+        Retorna la sesión, que debe pasarse a `end` al terminar, o None si no
+        se está perfilando.
+        """
+        session = self._session
+        if session is None or session.mode != 'cprofile':
+            return None
+        if not session.profile_busy.acquire(blocking=False):
+            session.skipped += 1
+            return None
+        if session.profile is None:
+            session.profile = cProfile.Profile()
+        session.profile.enable()
+        return session
+
+    def end(self, session: Optional[ProfilingSession]):
+        if session is not None:
+            session.profile.disable()
+            session.profile_busy.release()
+
+    def request_finished(self):
+        session = self._session
+        if session is not None:
+            session.request_finished()
+
+    def run(self, mode: str = 'sample', seconds: float = 10.0, requests: Optional[int] = None,
+            interval: float = 0.005) -> Dict:
+        """Perfila durante `seconds` (o hasta `requests` peticiones) y retorna el informe.
+
+        Bloquea al llamante mientras dura la sesión. Lanza RuntimeError si ya
+        hay otra en curso.
+        """
+        if mode not in self.MODES:
+            raise ValueError("Modo de perfilado desconocido: %s" % mode)
+        with self._lock:
+            if self._session is not None:
+                raise RuntimeError("Ya hay una sesión de perfilado en curso")
+            session = ProfilingSession(mode, seconds, requests, interval)
+            self._session = session
+
+        sampler = None
+        if mode == 'sample':
+            sampler = threading.Thread(target=self._sample, args=(session, threading.get_ident()),
+                                       daemon=True, name='profiler-sampler')
+            sampler.start()
+        try:
+            session.done.wait(seconds)
+        finally:
+            self._session = None
+            session.done.set()
+            if sampler is not None:
+                sampler.join()
+        return session.report()
+
+    def _sample(self, session: ProfilingSession, caller: int):
+        own = threading.get_ident()
+        while not session.done.wait(session.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in (own, caller):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append('%s:%s' % (code.co_filename.rsplit('/', 1)[-1], code.co_name))
+                    frame = frame.f_back
+                if stack and stack[0] in IDLE_FRAMES:
+                    session.idle_samples += 1
+                    continue
+                session.stacks[';'.join(reversed(stack))] += 1
+                session.samples += 1
+
+
+PROFILER = Profiler()
@@ -0,0 +1,103 @@
+import json
+import threading
+import urllib.request
+from typing import IO, Dict, Iterator, Optional, Tuple
+
+from blockchain import Blockchain
+from metrics import Counter
+
+REPLICA_RECONNECTS = Counter('replica_reconnects_total',
+                             'Reconexiones de la réplica al flujo de eventos del escritor')
+REPLICA_BLOCKS = Counter('replica_blocks_applied_total', 'Bloques aplicados desde el registro en disco')
+
+
+def read_events(stream: IO[bytes]) -> Iterator[Tuple[Optional[int], str, Dict]]:
+    """Decodifica un flujo de Server-Sent Events en tuplas (id, evento, datos)"""
+    event_id, event, data = None, 'message', []
+    for raw in stream:
+        line = raw.decode('utf-8').rstrip('\r\n')
+        if not line:
+            if data:
+                yield event_id, event, json.loads('\n'.join(data))
+            event_id, event, data = None, 'message', []
+            continue
+        if line.startswith(':'):
+            continue  # Comentario de mantenimiento
+        field, _, value = line.partition(':')
+        value = value[1:] if value.startswith(' ') else value
+        if field == 'id':
+            event_id = int(value)
+        elif field == 'event':
+            event = value
+        elif field == 'data':
+            data.append(value)
+
+
+class ChainFollower:
+    """Mantiene al día una cadena de solo lectura a partir del proceso escritor.
+
+    Los bloques no viajan por la red: se leen del registro en disco que el
+    escritor comparte (`Blockchain.sync`). Del escritor solo hace falta lo
+    que no está en disco, las reservas del mempool, que se siguen con su
+    flujo de eventos: al conectar se carga el estado completo y después cada
+    evento trae las reservas que cambió. Los eventos se republican en el
+    EventBus local, con el identificador del escritor, una vez aplicado el
+    bloque que anuncian, así que un cliente que reacciona a un evento ya lee
+    la altura nueva en esta réplica.
+
+    Si el escritor no responde, se sigue el registro por sondeo cada
+    `poll_interval` segundos mientras se reintenta la conexión.
+    """
+
+    def __init__(self, blockchain: Blockchain, writer_url: str, poll_interval: float = 1.0,
+                 timeout: float = 45.0):
+        self.blockchain = blockchain
+        self.writer_url = writer_url.rstrip('/')
+        self.poll_interval = poll_interval
+        self.timeout = timeout  # Más que el intervalo de mantenimiento del flujo de eventos
+        self.connected = False
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name='chain-follower')
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self._follow()
+            except (OSError, ValueError, KeyError) as e:
+                # Escritor caído o reiniciándose; URLError y los cortes del flujo son OSError
+                if self.connected:
+                    print(f"Réplica desconectada del escritor: {e}")
+                    REPLICA_RECONNECTS.inc()
+            self.connected = False
+            REPLICA_BLOCKS.inc(self.blockchain.sync())
+            self._stopped.wait(self.poll_interval)
+
+    def _follow(self):
+        with urllib.request.urlopen(self.writer_url + '/api/pending-transactions/state',
+                                    timeout=self.timeout) as response:
+            state = json.load(response)
+        mirror = self.blockchain.pending_transactions
+        REPLICA_BLOCKS.inc(self.blockchain.sync(
+            lambda: mirror.reset(state['pending'], state['reserved'])))
+
+        events = self.blockchain.events
+        if state['event_id'] != events.last_id:
+            # Los clientes de esta réplica pudieron perderse eventos
+            events.publish('resync', {}, state['event_id'])
+        self.connected = True
+
+        url = '%s/api/events?since=%d' % (self.writer_url, state['event_id'])
+        with urllib.request.urlopen(url, timeout=self.timeout) as stream:
+            for event_id, event, data in read_events(stream):
+                if event == 'resync' or self._stopped.is_set():
+                    return  # Se vuelve a cargar el estado completo
+                REPLICA_BLOCKS.inc(self.blockchain.sync(
+                    lambda: mirror.update(data['pending'], data.get('reserved', {}))))
+                events.publish(event, data, event_id)
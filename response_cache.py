@@ -0,0 +1,75 @@
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class CachedResponse:
+    """Cuerpo ya serializado de una respuesta, con su ETag y su versión comprimida"""
+
+    __slots__ = ('body', 'mimetype', 'etag', 'gzipped')
+
+    def __init__(self, body: bytes, mimetype: str, compress_min: Optional[int] = None):
+        self.body = body
+        self.mimetype = mimetype
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        # Los cuerpos grandes se comprimen una sola vez, al guardarlos
+        self.gzipped: Optional[bytes] = None
+        if compress_min is not None and len(body) >= compress_min:
+            self.gzipped = gzip.compress(body, compresslevel=6)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzipped or b'')
+
+
+class ResponseCache:
+    """Caché LRU de respuestas limitada por bytes.
+
+    Las claves incluyen la versión del estado del que depende la respuesta
+    (altura de la cadena, versión de las pendientes...), así que nunca hace
+    falta invalidar: al cambiar el estado las entradas viejas dejan de pedirse
+    y acaban expulsadas por las nuevas.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, compress_min: Optional[int] = 1024):
+        self.max_bytes = max_bytes
+        self.compress_min = compress_min  # Tamaño desde el que se guarda en gzip (None: nunca)
+        self._entries: 'OrderedDict[Hashable, CachedResponse]' = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, body: bytes, mimetype: str) -> CachedResponse:
+        """Guarda una respuesta y retorna su entrada (que no se guarda si no cabe)"""
+        entry = CachedResponse(body, mimetype, self.compress_min)
+        if entry.size * 2 > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous.size
+            self._entries[key] = entry
+            self._size += entry.size
+            self._evict()
+        return entry
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._size -= entry.size
@@ -0,0 +1,159 @@
+"""Servidor de producción con varios procesos sobre una misma cadena.
+
+Todo el estado de `app.py` vive en memoria de un proceso, así que no puede
+repartirse sin más entre varios. Este lanzador arranca:
+
+- Un proceso escritor (BLOCKCHAIN_ROLE=writer), el único que mina, acepta
+  transacciones y escribe `blockchain_data/` y `accounts.db`. Escucha solo en
+  127.0.0.1:--writer-port.
+- --workers procesos lectores (BLOCKCHAIN_ROLE=reader) que comparten el
+  socket público. Cada uno abre en solo lectura el registro de bloques
+  (mapeado en memoria) y la base de cuentas, aplica los bloques nuevos en
+  cuanto el escritor los anuncia y responde las lecturas sin pasar por él;
+  las peticiones que modifican el estado o leen el mempool se reenvían al
+  escritor.
+
+    python serve.py --workers 8 --port 5000
+
+Los procesos que terminan de forma inesperada se vuelven a arrancar. Las
+lecturas siguen funcionando mientras el escritor se reinicia.
+"""
+import argparse
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+
+def wait_until_ready(url: str, process: subprocess.Popen, timeout: float) -> bool:
+    """Espera a que `url` responda mientras el proceso siga vivo"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            with urllib.request.urlopen(url, timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def run_worker(args):
+    """Ejecuta un proceso escritor o lector (lo llama el lanzador)"""
+    from werkzeug.serving import make_server
+
+    # Terminar con SystemExit para que atexit cierre la cadena y la base de cuentas
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    import app as server
+
+    httpd = make_server(args.host, args.port, server.app, threaded=True, fd=args.fd)
+    print(f"{args.role} {os.getpid()} escuchando en {args.host}:{httpd.port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+class Supervisor:
+    """Arranca el escritor y los lectores y los reinicia si terminan"""
+
+    def __init__(self, args):
+        self.args = args
+        self.writer_url = 'http://127.0.0.1:%d' % args.writer_port
+        self.listener: Optional[socket.socket] = None
+        self.processes: Dict[str, subprocess.Popen] = {}
+        self.stopping = False
+
+    def spawn(self, name: str) -> subprocess.Popen:
+        env = dict(os.environ, BLOCKCHAIN_WRITER_URL=self.writer_url)
+        command = [sys.executable, os.path.abspath(__file__)]
+        pass_fds = ()
+        if name == 'writer':
+            env['BLOCKCHAIN_ROLE'] = 'writer'
+            command += ['--role', 'writer', '--host', '127.0.0.1', '--port', str(self.args.writer_port)]
+        else:
+            env['BLOCKCHAIN_ROLE'] = 'reader'
+            fd = self.listener.fileno()
+            command += ['--role', 'reader', '--host', self.args.host, '--port', str(self.args.port),
+                        '--fd', str(fd)]
+            pass_fds = (fd,)
+        process = subprocess.Popen(command, env=env, pass_fds=pass_fds)
+        self.processes[name] = process
+        return process
+
+    def start(self) -> bool:
+        writer = self.spawn('writer')
+        # El escritor crea la cadena y la base de cuentas que abren los lectores
+        if not wait_until_ready(self.writer_url + '/api/chain/head', writer, self.args.startup_timeout):
+            print("El escritor no llegó a responder", file=sys.stderr)
+            self.stop()
+            return False
+
+        # Un único socket compartido: el núcleo reparte las conexiones entre los lectores
+        self.listener = socket.create_server((self.args.host, self.args.port), backlog=1024)
+        self.listener.set_inheritable(True)
+        for index in range(self.args.workers):
+            self.spawn('reader-%d' % index)
+        print(f"Escritor en {self.writer_url}, {self.args.workers} lectores en "
+              f"http://{self.args.host}:{self.args.port}")
+        return True
+
+    def supervise(self):
+        while not self.stopping:
+            for name, process in list(self.processes.items()):
+                code = process.poll()
+                if code is not None and not self.stopping:
+                    print(f"{name} terminó con código {code}; se reinicia", file=sys.stderr)
+                    self.spawn(name)
+            time.sleep(1)
+
+    def stop(self, *_):
+        self.stopping = True
+        for process in self.processes.values():
+            if process.poll() is None:
+                process.terminate()
+        for process in self.processes.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self.listener is not None:
+            self.listener.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000, help='puerto público de los lectores')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='procesos lectores (por defecto, uno por núcleo)')
+    parser.add_argument('--writer-port', type=int, default=5001,
+                        help='puerto interno del escritor, solo en 127.0.0.1')
+    parser.add_argument('--startup-timeout', type=float, default=120.0,
+                        help='segundos de espera a que el escritor cree la cadena')
+    parser.add_argument('--role', choices=('writer', 'reader'), help=argparse.SUPPRESS)
+    parser.add_argument('--fd', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.role:
+        run_worker(args)
+        return 0
+
+    supervisor = Supervisor(args)
+    signal.signal(signal.SIGTERM, supervisor.stop)
+    if not supervisor.start():
+        return 1
+    try:
+        supervisor.supervise()
+    except KeyboardInterrupt:
+        supervisor.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
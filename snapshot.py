@@ -0,0 +1,124 @@
+import bisect
+from typing import TYPE_CHECKING, Dict, Hashable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from blockchain import Block
+
+
+_MISSING = object()
+
+
+class Overlay:
+    """Mapa inmutable formado por capas de cambios sobre una base.
+
+    `update` retorna una versión nueva que solo guarda las claves cambiadas y
+    comparte el resto con la anterior, así que publicar una versión por bloque
+    cuesta lo que cambió el bloque y no el tamaño del mapa. Para que las
+    búsquedas no recorran demasiadas capas, cada `max_depth` versiones se
+    fusionan las capas en una sola; la base completa solo se copia cuando esa
+    capa fusionada alcanza la mitad de su tamaño.
+    """
+
+    __slots__ = ('_changes', '_parent', '_depth')
+
+    def __init__(self, changes: Optional[Dict] = None, parent: Optional['Overlay'] = None):
+        self._changes = changes or {}
+        self._parent = parent
+        self._depth = 0 if parent is None else parent._depth + 1
+
+    def get(self, key: Hashable, default=None):
+        node = self
+        while node is not None:
+            value = node._changes.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            node = node._parent
+        return default
+
+    def update(self, changes: Dict, max_depth: int = 32) -> 'Overlay':
+        """Versión nueva con `changes` aplicados; esta no se modifica"""
+        if self._depth < max_depth:
+            return Overlay(changes, self)
+
+        layers = []
+        node = self
+        while node._parent is not None:
+            layers.append(node._changes)
+            node = node._parent
+        merged = {}
+        for layer in reversed(layers):
+            merged.update(layer)
+        merged.update(changes)
+
+        if len(merged) * 2 > len(node._changes):
+            full = dict(node._changes)
+            full.update(merged)
+            return Overlay(full)
+        return Overlay(merged, node)
+
+
+class ChainSnapshot:
+    """Vista inmutable de la cadena tal como quedó tras confirmar un bloque.
+
+    Los lectores la obtienen con `Blockchain.snapshot()` sin tomar ningún
+    cerrojo: nunca esperan a la minería ni a una confirmación en curso, y
+    todo lo que leen de una misma instantánea (saldos, historial, bloques y
+    estadísticas) corresponde a la misma altura. Los bloques y las listas del
+    índice por dirección solo crecen, así que basta con no mirar más allá de
+    `length`.
+    """
+
+    __slots__ = ('length', 'tip_hash', 'tip_timestamp', 'chain', 'accounts',
+                 'reward_per_miner', 'address_index', 'miners', 'transaction_count',
+                 'total_supply', 'total_fees')
+
+    def __init__(self, length: int, tip: 'Block', chain: Sequence['Block'], accounts: Overlay,
+                 reward_per_miner: float, address_index: Dict[str, List[Tuple[int, int]]],
+                 miners: int, transaction_count: int, total_supply: float, total_fees: float):
+        self.length = length
+        self.tip_hash = tip.hash
+        self.tip_timestamp = tip.timestamp
+        self.chain = chain
+        self.accounts = accounts  # dirección -> (saldo, punto de cobro de comisiones o None)
+        self.reward_per_miner = reward_per_miner
+        self.address_index = address_index
+        self.miners = miners
+        self.transaction_count = transaction_count
+        self.total_supply = total_supply
+        self.total_fees = total_fees
+
+    @property
+    def height(self) -> int:
+        return self.length - 1
+
+    def balance(self, address: str) -> float:
+        """Saldo confirmado, incluidas las comisiones por cobrar"""
+        account = self.accounts.get(address)
+        if account is None:
+            return 0.0
+        balance, checkpoint = account
+        if checkpoint is None:
+            return balance
+        return balance + self.reward_per_miner - checkpoint
+
+    def block(self, height: int) -> Optional['Block']:
+        if 0 <= height < self.length:
+            return self.chain[height]
+        return None
+
+    def _positions(self, address: str) -> Tuple[List[Tuple[int, int]], int]:
+        positions = self.address_index.get(address, [])
+        return positions, bisect.bisect_left(positions, (self.length, 0))
+
+    def history_length(self, address: str) -> int:
+        return self._positions(address)[1]
+
+    def history(self, address: str, cursor: int = 0, limit: Optional[int] = None) -> List[Dict]:
+        """Transacciones de la dirección hasta esta altura, como copias con block_index y tx_index"""
+        positions, count = self._positions(address)
+        end = count if limit is None else min(cursor + limit, count)
+        history = []
+        for block_index, tx_position in positions[cursor:end]:
+            tx_dict = self.chain[block_index].transactions[tx_position]
+            history.append(dict(tx_dict, block_index=block_index, tx_index=tx_position))
+        return history
@@ -0,0 +1,343 @@
+import json
+import mmap
+import os
+import queue
+import sqlite3
+import struct
+import sys
+import threading
+from array import array
+from typing import Any, Dict, Optional, Tuple
+
+
+class BlockStore:
+    """Registro de bloques en disco de solo añadido.
+    
+    `blocks.dat` guarda cada bloque serializado seguido de un salto de línea y
+    `blocks.idx` el desplazamiento final de cada registro como entero de 8
+    bytes, de modo que el bloque n se lee directamente del archivo mapeado en
+    memoria sin recorrer ni cargar los anteriores.
+    
+    Con read_only=True otro proceso es el que escribe: no se repara ni se
+    modifica nada, y `refresh` incorpora los registros que ese proceso haya
+    indexado desde la última vez.
+    """
+    
+    DATA_FILE = 'blocks.dat'
+    INDEX_FILE = 'blocks.idx'
+    
+    def __init__(self, directory: str, sync: bool = True, read_only: bool = False):
+        self.directory = directory
+        self.sync = sync  # fsync tras cada bloque para sobrevivir a caídas del sistema
+        self.read_only = read_only
+        self._data_path = os.path.join(directory, self.DATA_FILE)
+        self._index_path = os.path.join(directory, self.INDEX_FILE)
+        self._offsets = array('Q')
+        self._lock = threading.Lock()  # Índice en memoria y mapa de lectura
+        self._append_lock = threading.Lock()  # Un escritor a la vez en los archivos
+        self._map: Optional[mmap.mmap] = None
+        self._mapped_size = 0
+        
+        if read_only:
+            self._data = open(self._data_path, 'rb')
+            self._index = open(self._index_path, 'rb')
+            self.refresh()
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self._recover()
+            self._data = open(self._data_path, 'a+b')
+            self._index = open(self._index_path, 'ab')
+    
+    def _recover(self):
+        """Carga el índice y descarta cualquier registro escrito a medias"""
+        for path in (self._data_path, self._index_path):
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+        
+        index_size = os.path.getsize(self._index_path)
+        with open(self._index_path, 'rb') as f:
+            self._offsets.fromfile(f, index_size // 8)
+        if sys.byteorder == 'big':
+            self._offsets.byteswap()
+        
+        data_size = os.path.getsize(self._data_path)
+        while self._offsets and self._offsets[-1] > data_size:
+            self._offsets.pop()
+        
+        if index_size != len(self._offsets) * 8:
+            os.truncate(self._index_path, len(self._offsets) * 8)
+        if data_size != self._end():
+            os.truncate(self._data_path, self._end())
+    
+    def _end(self) -> int:
+        return self._offsets[-1] if self._offsets else 0
+    
+    def __len__(self) -> int:
+        return len(self._offsets)
+    
+    def refresh(self) -> int:
+        """Carga las entradas del índice añadidas por el escritor; retorna cuántas hay nuevas.
+        
+        El escritor guarda los datos antes que su entrada en el índice, así
+        que todo registro indexado ya está completo en `blocks.dat`.
+        """
+        with self._lock:
+            self._index.seek(len(self._offsets) * 8)
+            new = self._index.read()
+            new = new[:len(new) - len(new) % 8]  # Una entrada a medio escribir se lee la próxima vez
+            if not new:
+                return 0
+            offsets = array('Q', new)
+            if sys.byteorder == 'big':
+                offsets.byteswap()
+            self._offsets.extend(offsets)
+            return len(offsets)
+    
+    def append(self, data: bytes) -> int:
+        """Añade un registro al final y retorna su posición"""
+        if self.read_only:
+            raise RuntimeError("El almacén de bloques está abierto en solo lectura")
+        # Las escrituras y los fsync no toman `_lock`: las lecturas de otros
+        # bloques no esperan al disco, solo a que se publique el desplazamiento
+        with self._append_lock:
+            self._data.write(data + b'\n')
+            self._data.flush()
+            if self.sync:
+                os.fsync(self._data.fileno())
+            
+            # El índice se escribe después de los datos: un corte entre ambas
+            # escrituras deja un registro sin indexar que _recover descarta
+            end = self._end() + len(data) + 1
+            self._index.write(struct.pack('<Q', end))
+            self._index.flush()
+            if self.sync:
+                os.fsync(self._index.fileno())
+            
+            with self._lock:
+                self._offsets.append(end)
+                return len(self._offsets) - 1
+    
+    def read(self, position: int) -> bytes:
+        """Lee el registro en la posición dada desde el archivo mapeado"""
+        with self._lock:
+            start = self._offsets[position - 1] if position > 0 else 0
+            end = self._offsets[position]
+            if end > self._mapped_size:
+                self._remap()
+            return self._map[start:end - 1]
+    
+    def _remap(self):
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mapped_size = len(self._map)
+    
+    def close(self):
+        with self._append_lock, self._lock:
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+                self._mapped_size = 0
+            self._data.close()
+            self._index.close()
+
+
+def read_json(path: str, default: Any = None) -> Any:
+    """Lee un archivo JSON, o retorna `default` si no existe"""
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_json_atomic(path: str, data: Any):
+    """Escribe un JSON de forma atómica: o queda el archivo nuevo completo o el anterior"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class AccountStore:
+    """Usuarios y saldos registrados, guardados en SQLite en modo WAL.
+    
+    Cada alta se escribe como un registro individual en lugar de reescribir un
+    archivo completo. Las escrituras pasan por un único hilo escritor que
+    agrupa en una sola transacción todas las que llegan mientras confirma la
+    anterior, así que bajo carga muchas altas comparten un commit. Nada se
+    carga en memoria al arrancar: las consultas van directamente a la base.
+    
+    Con read_only=True la base la escribe otro proceso: no se arranca el hilo
+    escritor y el número de usuarios se vuelve a contar cuando SQLite indica
+    que hubo cambios (`PRAGMA data_version`).
+    """
+    
+    def __init__(self, path: str = 'accounts.db', users_file: Optional[str] = None,
+                 balances_file: Optional[str] = None, batch_size: int = 512,
+                 read_only: bool = False):
+        self.path = path
+        self.batch_size = batch_size
+        self.read_only = read_only
+        self._local = threading.local()
+        self._queue: "queue.Queue" = queue.Queue()
+        self._user_count: Optional[int] = None
+        self._count_lock = threading.Lock()
+        self._count_conn: Optional[sqlite3.Connection] = None
+        self._count_version: Optional[int] = None
+        
+        if read_only:
+            self._count_conn = self._connect()
+            return
+        
+        # `balances` solo conserva lo importado de balances.json y el saldo
+        # inicial de cada alta; los saldos vigentes se calculan de la cadena
+        self._writer_conn = self._connect()
+        self._writer_conn.executescript('''
+            CREATE TABLE IF NOT EXISTS users (
+                email TEXT PRIMARY KEY,
+                password TEXT NOT NULL,
+                wallet_address TEXT NOT NULL UNIQUE,
+                created_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS balances (
+                wallet_address TEXT PRIMARY KEY,
+                balance REAL NOT NULL
+            );
+        ''')
+        self._writer_conn.commit()
+        
+        # Migración única desde los antiguos users.json / balances.json
+        if self._is_empty():
+            self.import_json(users_file, balances_file)
+        
+        self._writer = threading.Thread(target=self._write_loop, daemon=True,
+                                        name='account-writer')
+        self._writer.start()
+    
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+    
+    def _reader(self) -> sqlite3.Connection:
+        """Conexión de lectura propia de cada hilo"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+    
+    def _is_empty(self) -> bool:
+        return self._writer_conn.execute('SELECT 1 FROM users LIMIT 1').fetchone() is None
+    
+    def import_json(self, users_file: Optional[str], balances_file: Optional[str]) -> int:
+        """Importa usuarios y saldos de los archivos JSON antiguos; retorna los usuarios importados"""
+        users = read_json(users_file, {}) if users_file else {}
+        balances = read_json(balances_file, {}) if balances_file else {}
+        
+        with self._writer_conn:
+            self._writer_conn.executemany(
+                'INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?)',
+                ((email, user['password'], user['wallet_address'], user['created_at'])
+                 for email, user in users.items()))
+            self._writer_conn.executemany(
+                'INSERT OR REPLACE INTO balances VALUES (?, ?)', balances.items())
+        
+        self._user_count = None
+        return len(users)
+    
+    def _submit(self, *statements: Tuple[str, tuple]) -> int:
+        """Encola sentencias que se aplican juntas y espera a que queden confirmadas.
+        
+        Retorna las filas afectadas por la primera sentencia.
+        """
+        if self.read_only:
+            raise RuntimeError("La base de cuentas está abierta en solo lectura")
+        done = threading.Event()
+        op = [statements, done, None]
+        self._queue.put(op)
+        done.wait()
+        if isinstance(op[2], Exception):
+            raise op[2]
+        return op[2]
+    
+    def _write_loop(self):
+        while True:
+            op = self._queue.get()
+            if op is None:
+                return
+            batch = [op]
+            while len(batch) < self.batch_size:
+                try:
+                    op = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if op is None:
+                    self._queue.put(None)  # Terminar tras confirmar este lote
+                    break
+                batch.append(op)
+            
+            try:
+                with self._writer_conn:
+                    for op in batch:
+                        counts = [self._writer_conn.execute(sql, params).rowcount
+                                  for sql, params in op[0]]
+                        op[2] = counts[0]
+            except Exception as e:
+                for op in batch:
+                    op[2] = e
+            for op in batch:
+                op[1].set()
+    
+    def create_user(self, email: str, password: str, wallet_address: str,
+                    created_at: str, balance: float = 0) -> bool:
+        """Registra un usuario con su saldo inicial; retorna False si el email ya existe"""
+        created = self._submit(
+            ('INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?)',
+             (email, password, wallet_address, created_at)),
+            # changes() se refiere a la sentencia anterior: solo hay saldo si hubo alta
+            ('INSERT OR REPLACE INTO balances SELECT ?, ? WHERE changes() = 1',
+             (wallet_address, balance))) == 1
+        if created:
+            with self._count_lock:
+                if self._user_count is not None:
+                    self._user_count += 1
+        return created
+    
+    def get_user(self, email: str) -> Optional[Dict]:
+        row = self._reader().execute(
+            'SELECT password, wallet_address, created_at FROM users WHERE email = ?',
+            (email,)).fetchone()
+        if row is None:
+            return None
+        return {'password': row[0], 'wallet_address': row[1], 'created_at': row[2]}
+    
+    def has_user(self, email: str) -> bool:
+        return self._reader().execute(
+            'SELECT 1 FROM users WHERE email = ?', (email,)).fetchone() is not None
+    
+    def count_users(self) -> int:
+        """Número de usuarios; se cuenta una vez y luego se mantiene en memoria"""
+        with self._count_lock:
+            if self._count_conn is not None:
+                version = self._count_conn.execute('PRAGMA data_version').fetchone()[0]
+                if version != self._count_version:
+                    self._count_version = version
+                    self._user_count = self._count_conn.execute(
+                        'SELECT COUNT(*) FROM users').fetchone()[0]
+                return self._user_count
+            if self._user_count is None:
+                self._user_count = self._reader().execute(
+                    'SELECT COUNT(*) FROM users').fetchone()[0]
+            return self._user_count
+    
+    def close(self):
+        """Confirma las escrituras pendientes y detiene el hilo escritor"""
+        if self.read_only:
+            self._count_conn.close()
+            return
+        self._queue.put(None)
+        self._writer.join()
+        self._writer_conn.close()
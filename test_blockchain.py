@@ -0,0 +1,177 @@
+import json
+import os
+import tempfile
+import threading
+
+from blockchain import Blockchain, Transaction
+from mempool import Mempool
+from merkle import hash_transaction, verify_merkle_proof
+
+
+def test_block_with_evicted_transaction_is_not_committed():
+    bc = Blockchain(difficulty=1, mempool_size=2)
+    bc.balances['alice'] = 1.6
+    bc.balances['bob'] = 100.0
+    
+    t1 = Transaction("alice", "carol", 1.0)
+    assert bc.add_transaction(t1)
+    new_block, included = bc.prepare_block("miner1")
+    assert t1 in included
+    
+    # Mientras se mina, dos transacciones de más comisión desplazan a t1 del
+    # mempool y el saldo que reservaba vuelve a estar disponible
+    assert bc.add_transaction(Transaction("bob", "carol", 5))
+    assert bc.add_transaction(Transaction("bob", "carol", 6))
+    assert t1 not in bc.pending_transactions
+    t2 = Transaction("alice", "carol", 1.55)
+    bc.pending_transactions.max_size = 3  # Sitio para t2, de menos comisión que las de bob
+    assert bc.add_transaction(t2)
+    
+    assert new_block.mine_block(bc.miner).found
+    assert not bc.commit_block(new_block, included, "miner1")
+    assert len(bc.chain) == 1
+    
+    # La plantilla rehecha solo incluye lo que sigue pendiente
+    while len(bc.pending_transactions):
+        assert bc.mine_pending_transactions("miner1") is not None
+    assert bc.get_balance('alice') >= 0
+    assert bc.is_chain_valid()
+    bc.close()
+
+
+def test_cancelled_parallel_mining_does_not_commit():
+    bc = Blockchain(difficulty=1, mining_workers=2)
+    cancel = threading.Event()
+    cancel.set()
+    
+    assert bc.mine_pending_transactions("miner1", cancel=cancel) is None
+    assert len(bc.chain) == 1
+    bc.close()
+
+
+def test_mempool_reservations_follow_evictions():
+    mempool = Mempool(max_size=2)
+    low = Transaction("alice", "bob", 1)
+    mid = Transaction("alice", "bob", 2)
+    high = Transaction("carol", "bob", 3)
+    
+    assert mempool.add(low) == (True, [])
+    assert mempool.add(mid) == (True, [])
+    assert abs(mempool.reserved("alice") - 3.06) < 1e-9
+    
+    # La de menor comisión sale y libera lo que reservaba
+    assert mempool.add(high) == (True, [low])
+    assert abs(mempool.reserved("alice") - 2.04) < 1e-9
+    assert mempool.add(Transaction("dave", "bob", 0.5)) == (False, [])
+    assert mempool.select(1) == [high]
+    
+    mempool.remove([mid, high])
+    assert len(mempool) == 0
+    assert mempool.reservations() == {}
+
+
+def test_merkle_proofs_verify_every_transaction():
+    bc = Blockchain(difficulty=1)
+    bc.balances['alice'] = 100.0
+    for amount in range(1, 6):
+        assert bc.add_transaction(Transaction("alice", "bob", amount))
+    block = bc.mine_pending_transactions("miner1")
+    
+    root = bytes.fromhex(block.merkle_root)
+    for position, tx in enumerate(block.transactions):
+        proof = block.get_merkle_proof(position)
+        assert verify_merkle_proof(hash_transaction(tx), proof, root)
+    forged = dict(block.transactions[1], amount=1e6)
+    assert not verify_merkle_proof(hash_transaction(forged), block.get_merkle_proof(1), root)
+    bc.close()
+
+
+def test_retarget_is_clamped_to_a_factor_of_four():
+    bc = Blockchain(difficulty=1, block_time=10, retarget_interval=2)
+    bc.mine_pending_transactions("miner1")
+    previous = bc.chain[1].target
+    
+    bc.chain[1].timestamp = bc.chain[0].timestamp  # Bloques instantáneos
+    assert bc.expected_target(2) == previous // 4
+    bc.chain[1].timestamp = bc.chain[0].timestamp + 3600  # Una hora en lugar de 10 s
+    assert bc.expected_target(2) == previous * 4
+    assert bc.expected_target(1) == bc.chain[0].target  # Fuera del reajuste no cambia
+    bc.close()
+
+
+def test_fees_are_shared_between_all_miners():
+    bc = Blockchain(difficulty=1)
+    bc.balances['alice'] = 100.0
+    first = bc.mine_pending_transactions("miner1")
+    assert bc.add_transaction(Transaction("alice", "bob", 10))
+    second = bc.mine_pending_transactions("miner2")
+    
+    fee_share = 0.2 / 2
+    reward1 = first.transactions[0]['amount']
+    reward2 = second.transactions[0]['amount']
+    assert abs(bc.get_balance("miner1") - (reward1 + fee_share)) < 1e-9
+    assert abs(bc.get_balance("miner2") - (reward2 + fee_share)) < 1e-9
+    assert abs(bc.total_fees - 0.2) < 1e-9
+    
+    # Al enviar, el minero cobra su parte y el acumulador no la vuelve a contar
+    assert bc.add_transaction(Transaction("miner1", "bob", 1))
+    assert bc.get_unclaimed_rewards("miner1") == 0
+    assert abs(bc.get_available_balance("miner1") - (reward1 + fee_share - 1.02)) < 1e-9
+    bc.close()
+
+
+def test_restart_replays_blocks_after_the_checkpoint():
+    with tempfile.TemporaryDirectory() as data_dir:
+        bc = Blockchain(difficulty=1, data_dir=data_dir, checkpoint_interval=3)
+        assert bc.add_transaction(Transaction("SISTEMA", "alice", 50))
+        bc.mine_pending_transactions("miner1")
+        for amount in (5, 7, 11):
+            assert bc.add_transaction(Transaction("alice", "bob", amount))
+            bc.mine_pending_transactions("miner2")
+        balances = {address: bc.get_balance(address)
+                    for address in ("alice", "bob", "miner1", "miner2")}
+        height = len(bc.chain)
+        
+        # Caída sin guardar el estado: la última copia es del bloque 3 y el 4
+        # se vuelve a aplicar desde el registro
+        bc.miner.close()
+        bc.store.close()
+        with open(os.path.join(data_dir, 'state.json')) as f:
+            assert json.load(f)['height'] == 3
+        
+        restarted = Blockchain(difficulty=1, data_dir=data_dir, checkpoint_interval=3)
+        assert len(restarted.chain) == height
+        for address, balance in balances.items():
+            assert abs(restarted.get_balance(address) - balance) < 1e-9
+        assert restarted.is_chain_valid(full=True)
+        assert restarted.get_history_length("alice") == 4
+        
+        # La cadena reabierta sigue aceptando bloques
+        assert restarted.add_transaction(Transaction("alice", "bob", 1))
+        assert restarted.mine_pending_transactions("miner1").index == height
+        restarted.close()
+
+
+def test_blockchain():
+    bc = Blockchain(difficulty=2)
+    bc.balances['user1'] = 20.0
+    
+    tx = Transaction("user1", "user2", 10)
+    assert bc.add_transaction(tx)
+    
+    block = bc.mine_pending_transactions("miner1")
+    assert block is not None
+    assert bc.is_chain_valid()
+    bc.close()
+
+
+if __name__ == '__main__':
+    test_block_with_evicted_transaction_is_not_committed()
+    test_cancelled_parallel_mining_does_not_commit()
+    test_mempool_reservations_follow_evictions()
+    test_merkle_proofs_verify_every_transaction()
+    test_retarget_is_clamped_to_a_factor_of_four()
+    test_fees_are_shared_between_all_miners()
+    test_restart_replays_blocks_after_the_checkpoint()
+    test_blockchain()
+    print("✅ Todos los tests pasaron")
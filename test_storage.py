@@ -0,0 +1,76 @@
+import os
+import struct
+import tempfile
+
+from storage import AccountStore, BlockStore
+
+
+def _store_with_records(directory, records):
+    store = BlockStore(directory, sync=False)
+    for record in records:
+        store.append(record)
+    store.close()
+
+
+def test_recover_discards_unindexed_data():
+    with tempfile.TemporaryDirectory() as directory:
+        _store_with_records(directory, [b'uno', b'dos'])
+        # Corte tras escribir los datos y antes de su entrada en el índice
+        with open(os.path.join(directory, BlockStore.DATA_FILE), 'ab') as f:
+            f.write(b'tres a medi')
+        
+        store = BlockStore(directory, sync=False)
+        assert len(store) == 2
+        assert store.read(1) == b'dos'
+        assert store.append(b'tres') == 2
+        assert store.read(2) == b'tres'
+        store.close()
+
+
+def test_recover_discards_torn_index_entries():
+    with tempfile.TemporaryDirectory() as directory:
+        _store_with_records(directory, [b'uno', b'dos'])
+        index_path = os.path.join(directory, BlockStore.INDEX_FILE)
+        data_size = os.path.getsize(os.path.join(directory, BlockStore.DATA_FILE))
+        with open(index_path, 'ab') as f:
+            # Una entrada que apunta más allá de los datos y otra a medio escribir
+            f.write(struct.pack('<Q', data_size + 100))
+            f.write(b'\x01\x02\x03')
+        
+        store = BlockStore(directory, sync=False)
+        assert len(store) == 2
+        assert os.path.getsize(index_path) == 16
+        assert [store.read(i) for i in range(2)] == [b'uno', b'dos']
+        store.close()
+
+
+def test_read_only_refresh_sees_new_records():
+    with tempfile.TemporaryDirectory() as directory:
+        writer = BlockStore(directory, sync=False)
+        writer.append(b'uno')
+        reader = BlockStore(directory, read_only=True)
+        assert len(reader) == 1
+        
+        writer.append(b'dos')
+        writer.append(b'tres')
+        assert len(reader) == 1
+        assert reader.refresh() == 2
+        assert reader.read(2) == b'tres'
+        assert reader.refresh() == 0
+        
+        # Una entrada de índice a medio escribir se incorpora en la siguiente lectura
+        with open(os.path.join(directory, BlockStore.INDEX_FILE), 'ab') as f:
+            f.write(b'\x00\x00')
+        assert reader.refresh() == 0
+        reader.close()
+        writer.close()
+
+
+def test_account_store_creates_users_once():
+    with tempfile.TemporaryDirectory() as directory:
+        accounts = AccountStore(os.path.join(directory, 'accounts.db'))
+        assert accounts.create_user('a@b.c', 'hash', 'wallet1', '2024-01-01')
+        assert not accounts.create_user('a@b.c', 'otro', 'wallet2', '2024-01-02')
+        assert accounts.get_user('a@b.c')['wallet_address'] == 'wallet1'
+        assert accounts.count_users() == 1
+        accounts.close()